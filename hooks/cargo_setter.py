@@ -1,37 +1,206 @@
 import os
 import re
 import shutil
+import tempfile
+from collections import deque
 import semver
 import toml
-from build import RustProject
+from build import RustProject, is_build_output
 
 
-def copytree(src_dir, dst_dir):
-    if not os.path.exists(dst_dir):
-        os.makedirs(dst_dir)
-    for item in os.listdir(src_dir):
-        src = os.path.join(src_dir, item)
-        dst = os.path.join(dst_dir, item)
-        if os.path.isdir(src):
-            copytree(src, dst)
-        else:
-            shutil.copy2(src, dst)
+def copy_file(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            # Copy in the kernel, reflinks on filesystems that support it
+            copied = 0
+            while copied < size:
+                count = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                if count == 0:
+                    break
+                copied += count
+        except (AttributeError, OSError):
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
 
 
-def copy_dependency(project_path, origin):
-    deps = [project_path]
-    cargo_path = os.path.join(project_path, "Cargo.toml")
+def copytree(src_dir, dst_dir, stats=None):
+    # Copy files whose size or mtime changed, returns the copied and skipped bytes
+    if stats is None:
+        stats = {"copied": 0, "skipped": 0}
+    os.makedirs(dst_dir, exist_ok=True)
+    for entry in os.scandir(src_dir):
+        dst = os.path.join(dst_dir, entry.name)
+        if entry.is_dir():
+            if not is_build_output(src_dir, entry.name):
+                copytree(entry.path, dst, stats)
+            continue
+        stat = entry.stat()
+        if os.path.exists(dst):
+            dst_stat = os.stat(dst)
+            if dst_stat.st_size == stat.st_size and dst_stat.st_mtime_ns == stat.st_mtime_ns:
+                stats["skipped"] += stat.st_size
+                continue
+        copy_file(entry.path, dst)
+        stats["copied"] += stat.st_size
+    return stats
+
+
+DEPENDENCY_TABLES = ("dependencies", "dev-dependencies", "build-dependencies")
+
+_manifests = {}
+
+
+def load_manifest(cargo_path):
+    # Parse each Cargo.toml once per process and again only when it changes
+    stat = os.stat(cargo_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if cargo_path in _manifests and _manifests[cargo_path][0] == key:
+        return _manifests[cargo_path][1]
     cargo = toml.load(cargo_path)
-    if "dependencies" in cargo:
-        for _, dep in cargo["dependencies"].items():
-            if "path" in dep and ".." in dep["path"]:
-                src = os.path.realpath(os.path.join(origin, dep["path"]))
-                dst = os.path.realpath(os.path.join(project_path, dep["path"]))
-                copytree(src, dst)
-                deps += copy_dependency(dst, src)
+    _manifests[cargo_path] = (key, cargo)
+    return cargo
+
+
+def path_dependencies(cargo):
+    # Out of tree path dependencies of all dependency tables, including target specific ones
+    tables = [cargo.get(table, {}) for table in DEPENDENCY_TABLES]
+    for target in cargo.get("target", {}).values():
+        tables += [target.get(table, {}) for table in DEPENDENCY_TABLES]
+    for table in tables:
+        for dep in table.values():
+            if isinstance(dep, dict) and ".." in dep.get("path", ""):
+                yield dep["path"]
+
+
+def copy_dependency(project_path, origin, stats=None):
+    # Breadth first, every crate is copied and listed once however many paths lead to it
+    deps = [project_path]
+    visited = {os.path.realpath(project_path)}
+    queue = deque([(project_path, origin)])
+    while queue:
+        project_path, origin = queue.popleft()
+        cargo = load_manifest(os.path.realpath(os.path.join(project_path, "Cargo.toml")))
+        for path in path_dependencies(cargo):
+            dst = os.path.realpath(os.path.join(project_path, path))
+            if dst in visited:
+                continue
+            visited.add(dst)
+            src = os.path.realpath(os.path.join(origin, path))
+            copytree(src, dst, stats)
+            deps.append(dst)
+            queue.append((dst, src))
     return deps
 
 
+TABLE_RE = re.compile(r"^\s*\[\[?\s*([^\]]*?)\s*\]")
+VERSION_KEY_RE = re.compile(r"^\s*version\s*[.=]")
+VERSION_RE = re.compile(r"""^(\s*version\s*=\s*)("(?:[^"\\\n]|\\.)*"|'[^'\n]*')(?!["'])""")
+INHERITED_VERSION_RE = re.compile(r"^\s*version\s*(\.|=\s*\{)")
+
+
+def toml_line_state(line, state):
+    # Track open brackets and multi-line strings, a line only starts a table or key when both are closed
+    depth, quote = state
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quote:
+            if quote == '"""' and char == "\\":
+                i += 2
+            elif line.startswith(quote, i):
+                quote = None
+                i += 3
+            else:
+                i += 1
+            continue
+        if char == "#":
+            break
+        if line.startswith('"""', i) or line.startswith("'''", i):
+            quote = line[i : i + 3]
+            i += 3
+            continue
+        if char == '"':
+            i += 1
+            while i < len(line) and line[i] != '"':
+                i += 2 if line[i] == "\\" else 1
+        elif char == "'":
+            end = line.find("'", i + 1)
+            i = end if end >= 0 else len(line)
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+        i += 1
+    return depth, quote
+
+
+def move_into_subfolder(folder, name):
+    # Move the whole tree aside and back below a fresh folder, two renames regardless of its size
+    tmp_folder = tempfile.mkdtemp(prefix=".", dir=os.path.dirname(os.path.abspath(folder)))
+    try:
+        os.rename(folder, tmp_folder)
+    except OSError:
+        os.rmdir(tmp_folder)
+        files = os.listdir(folder)
+        os.mkdir(os.path.join(folder, name))
+        for pfile in files:
+            shutil.move(os.path.join(folder, pfile), os.path.join(folder, name))
+        return
+    os.mkdir(folder)
+    os.rename(tmp_folder, os.path.join(folder, name))
+
+
+def set_package_version(cargo_path, version):
+    # Patch package.version line by line, keeping comments and formatting of the rest of the file
+    tmp_path = f"{cargo_path}.tmp"
+    state = (0, None)
+    table = None
+    done = False
+    unsure = False
+    with open(cargo_path, encoding="utf-8", newline="") as src, open(
+        tmp_path, "w", encoding="utf-8", newline=""
+    ) as dst:
+        for line in src:
+            if state == (0, None) and not unsure:
+                match = TABLE_RE.match(line)
+                if match:
+                    if table == "package" and not done:
+                        dst.write(f'version = "{version}"\n')
+                        done = True
+                    table = match.group(1)
+                elif table == "package" and not done and VERSION_KEY_RE.match(line):
+                    match = VERSION_RE.match(line)
+                    if match:
+                        line = f'{match.group(1)}"{version}"{line[match.end():]}'
+                        done = True
+                    elif INHERITED_VERSION_RE.match(line):
+                        line = f'version = "{version}"\n'
+                        done = True
+                    else:
+                        unsure = True
+            dst.write(line)
+            state = toml_line_state(line, state)
+        if table == "package" and not done and not unsure:
+            if not line.endswith("\n"):
+                dst.write("\n")
+            dst.write(f'version = "{version}"\n')
+            done = True
+    if not done or unsure or state != (0, None):
+        # Layouts the line patch does not handle, like a dotted package.version, go through a toml round trip
+        os.remove(tmp_path)
+        cargo = toml.load(cargo_path)
+        cargo["package"]["version"] = version
+        with open(cargo_path, "w", encoding="utf-8") as f:
+            toml.dump(cargo, f)
+        return
+    shutil.copymode(cargo_path, tmp_path)
+    os.replace(tmp_path, cargo_path)
+
+
 def post_source(output, conanfile, **kwargs):
     if hasattr(conanfile, 'has_workspace') and conanfile.has_workspace:
         return
@@ -39,25 +208,19 @@ def post_source(output, conanfile, **kwargs):
     if not isinstance(conanfile, RustProject):
         return
 
-    # Copy project files to subdir
-    project_files = os.listdir(conanfile.source_folder)
+    # Move project files to subdir
+    cwd = os.getcwd()
+    move_into_subfolder(conanfile.source_folder, conanfile.src)
+    if cwd == os.path.abspath(conanfile.source_folder):
+        os.chdir(cwd)
     src = os.path.join(conanfile.source_folder, conanfile.src)
-    os.mkdir(src)
-    for pfile in project_files:
-        shutil.move(pfile, src)
-
-    # Load cargo project file
 
     # Set version if it is not a git commit sha
     if not re.match("^[0-9a-f]{40}$", conanfile.version):
-        cargo_path = os.path.join(src, "Cargo.toml")
-        cargo = toml.load(cargo_path)
         version = str(conanfile.version)
         if not semver.parse(version, loose=True):
             version = f"0.0.0-{version}"
-        cargo["package"]["version"] = version.replace("_", "-")
-        with open(cargo_path, "w") as f:
-            toml.dump(cargo, f)
+        set_package_version(os.path.join(src, "Cargo.toml"), version.replace("_", "-"))
 
 
 def pre_build(output, conanfile, **kwargs):
@@ -69,7 +232,9 @@ def pre_build(output, conanfile, **kwargs):
 
     # Copy dependency source files to source folder
     src = os.path.join(conanfile.source_folder, conanfile.src)
-    deps = copy_dependency(src, os.environ["ORIGIN_FOLDER"])
+    stats = {"copied": 0, "skipped": 0}
+    deps = copy_dependency(src, os.environ["ORIGIN_FOLDER"], stats)
+    output.info(f"Copied {stats['copied']} bytes of path dependencies, skipped {stats['skipped']} unchanged bytes")
 
     # Copy Cargo.lock and rustfmt.toml to workspace as well
     cargolock_toml = os.path.join(src, "Cargo.lock")
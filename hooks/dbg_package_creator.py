@@ -1,7 +1,14 @@
+import hashlib
 import os
 import re
 import shutil
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import dwarf
+import elf
+from build import conan_home, is_build_output, link_or_copy
 
 TEMPLATE = """
 from build import *
@@ -32,6 +39,13 @@ class Debug(ConanFile):
         self.env_info.DEBUG_PATH.append(os.path.join(self.package_folder, "dbg"))
 """
 
+# Source files copied into the -dbg package
+SOURCE_SUFFIXES = frozenset(
+    (".c", ".C", ".cc", ".cpp", ".cxx", ".c++", ".h", ".H", ".hh", ".hpp", ".hxx", ".h++", ".rs", ".y", ".l")
+)
+# Build output folders that are not walked for sources
+PRUNED_FOLDERS = frozenset((".build_folder", ".git"))
+
 
 def post_export(output, conanfile, conanfile_path, reference, **kwargs):
     # Only create debug package when ending with -dbg
@@ -53,15 +67,279 @@ def run(exe, args=None, env=None):
         args = []
     if not shutil.which(exe):
         return (bytes("", "utf8"), bytes(f"Command '{exe}' not found", "utf8"), 127)
-    cmd = f"{exe} {' '.join(args)}"
+    cmd = [exe] + args
     if env or env == {}:
-        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, env=env)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, env=env)
     else:
-        proc = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
     stdout, stderr = proc.communicate()
     return (stdout, stderr, proc.wait())
 
 
+def jobs():
+    # Number of binaries processed concurrently (CONAN_DBG_JOBS overrides core count)
+    if "CONAN_DBG_JOBS" in os.environ:
+        return max(1, int(os.environ["CONAN_DBG_JOBS"]))
+    return os.cpu_count() or 1
+
+
+def walk_build_folder(build_folder, find_sources=True, find_key=False):
+    # Collect sources and the first private key in a single traversal of the build folder
+    sources = []
+    pem_file = ""
+    for root, dirs, files in os.walk(build_folder):
+        dirs[:] = sorted(folder for folder in dirs if not is_build_output(root, folder, PRUNED_FOLDERS))
+        for file in sorted(files):
+            suffix = os.path.splitext(file)[1]
+            if find_key and not pem_file and suffix == ".pem":
+                pem_file = os.path.join(root, file)
+                if not find_sources:
+                    return sources, pem_file
+            elif find_sources and suffix in SOURCE_SUFFIXES:
+                sources.append(os.path.join(root, file))
+    return sources, pem_file
+
+
+def referenced_sources(build_folder, prefix, dbg_files):
+    # Only sources in the build folder that the DWARF data of the debug files refers to
+    build_folder = os.path.normpath(build_folder)
+    sources = set()
+    for dbg_file in dbg_files:
+        for path in dwarf.source_files(dbg_file):
+            # Undo -fdebug-prefix-map=<build_folder>=<name> from Recipe.set_env
+            if path == prefix or path.startswith(prefix + os.sep):
+                path = build_folder + path[len(prefix) :]
+            if path.startswith(build_folder + os.sep) and os.path.isfile(path):
+                sources.add(path)
+    return sorted(sources)
+
+
+def copy_sources(build_folder, dest_folder, sources):
+    start = time.monotonic()
+    copied = 0
+    can_link = True
+    for src in sources:
+        dst = os.path.join(dest_folder, os.path.relpath(src, build_folder))
+        if os.path.exists(dst):
+            src_stat, dst_stat = os.stat(src), os.stat(dst)
+            if src_stat.st_size == dst_stat.st_size and src_stat.st_mtime == dst_stat.st_mtime:
+                continue
+            os.remove(dst)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        # Hardlink when source and package share a filesystem
+        if can_link:
+            try:
+                os.link(src, dst)
+                copied += 1
+                continue
+            except OSError:
+                can_link = False
+        shutil.copy2(src, dst)
+        copied += 1
+    print(f"Copied {copied} source files in {time.monotonic() - start:.2f}s")
+
+
+def unshare(bin_file):
+    # strip and objcopy rewrite files with several hardlinks in place, give the package its own copy first
+    if os.stat(bin_file).st_nlink > 1:
+        tmp_file = f"{bin_file}.unshare"
+        shutil.copy2(bin_file, tmp_file)
+        os.replace(tmp_file, bin_file)
+
+
+def sha256_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha
+
+
+class DebugCache:
+    # Bump when the strip/objcopy arguments change to invalidate old entries
+    VERSION = 2
+
+    def __init__(self, folder, max_size):
+        self.folder = folder
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        # CONAN_DBG_CACHE_SIZE is the cache size limit in MiB, 0 disables the cache
+        max_size = int(os.environ.get("CONAN_DBG_CACHE_SIZE", "4096")) * 1024 * 1024
+        if max_size <= 0:
+            return None
+        return cls(os.path.join(conan_home(), "dbg_cache"), max_size)
+
+    def key(self, bin_file, compress=None):
+        # Hash the content, post-link edits like patchelf keep the build-id and often the size
+        ident = f"sha256:{sha256_file(bin_file).hexdigest()}"
+        # The debug link stores the debug file name, so it is part of the key
+        ident = f"{self.VERSION}:{ident}:{os.path.basename(bin_file)}:{compress or 'none'}"
+        return hashlib.sha256(ident.encode("utf8")).hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.folder, key[:2], key)
+
+    def restore(self, key, bin_file, dbg_file):
+        entry = self.entry(key)
+        restored = [(f"{dbg_file}.restore", dbg_file), (f"{bin_file}.restore", bin_file)]
+        try:
+            # Restore next to the targets first, the binary is only replaced once both files are there
+            link_or_copy(os.path.join(entry, "debug"), restored[0][0])
+            link_or_copy(os.path.join(entry, "stripped"), restored[1][0])
+            # Mark entry as recently used
+            os.utime(entry)
+            for tmp_file, dst in restored:
+                os.replace(tmp_file, dst)
+            hit = True
+        except OSError:
+            # Missing, or evicted by another build in the meantime
+            for tmp_file, _ in restored:
+                if os.path.lexists(tmp_file):
+                    os.remove(tmp_file)
+            hit = False
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit
+
+    def store(self, key, bin_file, dbg_file):
+        entry = self.entry(key)
+        if os.path.isdir(entry):
+            return
+        tmp_entry = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_entry)
+        shutil.copy2(dbg_file, os.path.join(tmp_entry, "debug"))
+        shutil.copy2(bin_file, os.path.join(tmp_entry, "stripped"))
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # Another build stored the same entry in the meantime
+            shutil.rmtree(tmp_entry)
+
+    def evict(self):
+        # Remove least recently used entries until the cache fits its size limit
+        entries = []
+        total = 0
+        try:
+            prefixes = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return
+        for prefix in prefixes:
+            try:
+                prefix_entries = list(os.scandir(prefix.path))
+            except OSError:
+                continue
+            for entry in prefix_entries:
+                if entry.name.endswith(".tmp"):
+                    continue
+                # Builds sharing the Conan home evict concurrently, skip entries removed during the scan
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime, size, entry.path))
+                total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+class Signer:
+    def __init__(self, pem_file):
+        self.pem_file = pem_file
+        self.key = None
+        self.padding = None
+        # Sign in-process when cryptography is available, otherwise use openssl
+        try:
+            from cryptography.hazmat.primitives import hashes, serialization
+            from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa, utils
+        except ImportError:
+            return
+        with open(pem_file, "rb") as f:
+            try:
+                key = serialization.load_pem_private_key(f.read(), password=None)
+            except (TypeError, ValueError):
+                return
+        prehashed = utils.Prehashed(hashes.SHA256())
+        if isinstance(key, rsa.RSAPrivateKey):
+            self.key = key
+            self.sign_args = (padding.PKCS1v15(), prehashed)
+        elif isinstance(key, ec.EllipticCurvePrivateKey):
+            self.key = key
+            self.sign_args = (ec.ECDSA(prehashed),)
+
+    def sign(self, bin_file):
+        # Same output as `openssl dgst -sha256 -sign`
+        if not self.key:
+            run("openssl", ["dgst", "-sha256", "-sign", self.pem_file, "-out", f"{bin_file}.sign", bin_file])
+            return
+        signature = self.key.sign(sha256_file(bin_file).digest(), *self.sign_args)
+        with open(f"{bin_file}.sign", "wb") as f:
+            f.write(signature)
+
+
+def debug_compression(conanfile):
+    # CONAN_DBG_COMPRESS or the recipe attribute dbg_compress select zlib or zstd compressed debug files
+    compress = os.environ.get("CONAN_DBG_COMPRESS", getattr(conanfile, "dbg_compress", None))
+    if compress in (None, "", "none"):
+        return None
+    if compress not in ("zlib", "zstd"):
+        raise Exception(f"Invalid debug section compression: {compress}")
+    return compress
+
+
+def strip_binary(package_folder, bin_file, cache=None, compress=None):
+    log = []
+    # Scripts and data files are skipped before any tool runs
+    info = elf.classify(bin_file)
+    if not info.is_elf:
+        return log, None
+    root, file = os.path.split(bin_file)
+    # see https://www.zeuthen.desy.de/dv/documentation/unixguide/infohtml/gdb/Separate-Debug-Files.html
+    # `...gdb looks up the named file in the directory of the executable file,
+    #  then in a subdirectory of that directory named .debug,...`
+    dbg_path = os.path.join(package_folder, "dbg", root[1:])
+    dbg_file = f"{os.path.join(dbg_path, file)}.debug"
+    # Check if file has debug_info
+    if not info.has_debug_info:
+        # Some files without debug_info can still be stripped
+        if info.has_symtab:
+            unshare(bin_file)
+            run("strip", ["--strip-all", bin_file])
+        return log, None
+    os.makedirs(dbg_path, exist_ok=True)
+    key = cache.key(bin_file, compress) if cache else None
+    if cache and cache.restore(key, bin_file, dbg_file):
+        log.append("Restored stripped file: " + bin_file + "\nDebug file at: " + dbg_file)
+    else:
+        log.append("Stripping file: " + bin_file + "\nDebug file at: " + dbg_file)
+        unshare(bin_file)
+        # Extract debug info to debug file
+        objcopy_args = ["--only-keep-debug", bin_file, dbg_file]
+        if compress:
+            objcopy_args.insert(0, f"--compress-debug-sections={compress}")
+        run("objcopy", objcopy_args)
+        # Strip binary
+        run("strip", ["--strip-debug", "--strip-unneeded", bin_file])
+
+        # Link binary to debug file
+        run("objcopy", [f"--add-gnu-debuglink={dbg_file}", bin_file])
+        if cache:
+            cache.store(key, bin_file, dbg_file)
+
+    return log, dbg_file
+
+
 def post_package(output, conanfile, conanfile_path, **kwargs):
     assert conanfile
 
@@ -76,65 +354,72 @@ def post_package(output, conanfile, conanfile_path, **kwargs):
         ("libexec", r".*"),
     )
 
-    # Look in the build folder to find a private key to sign the .so files
-    pem_regex = re.compile(r".*\.pem$")
-    pem_file = ""
-    for root, _, files in os.walk(conanfile.build_folder):
-        for file in files:
-            if pem_regex.match(file):
-                if os.path.exists(os.path.join(root, file)):
-                    pem_file = os.path.join(root, file)
-                    print("Found a private key: " + pem_file + "\n not looking for any more keys")
-                    break
-                
+    # Collect binaries in a stable order so the log is deterministic
+    bin_files = []
     for path in paths:
         regex = re.compile(path[1])
-        for root, _, files in os.walk(os.path.join(conanfile.package_folder, path[0])):
-            for file in files:
-                if not regex.match(file):
-                    continue
+        for root, dirs, files in os.walk(os.path.join(conanfile.package_folder, path[0])):
+            dirs.sort()
+            for file in sorted(files):
                 bin_file = os.path.join(root, file)
-                # see https://www.zeuthen.desy.de/dv/documentation/unixguide/infohtml/gdb/Separate-Debug-Files.html
-                # `...gdb looks up the named file in the directory of the executable file, 
-                #  then in a subdirectory of that directory named .debug,...`
-                dbg_path = os.path.join(conanfile.package_folder, "dbg", root[1:])
-                if not os.path.exists(dbg_path):
-                    os.makedirs(dbg_path)
-                dbg_file = f"{os.path.join(dbg_path, file)}.debug"
-                # Check if file has debug_info
-                stdout, _, _ = run("file", [bin_file])
-                if not b"debug_info" in stdout:
-                    # Some files without debug_info can still be stripped
-                    if b"not stripped" in stdout:
-                        run("strip", ["--strip-all", bin_file])
-                    continue
-                print("Stripping file: " + bin_file +"\nDebug file at: " + dbg_file)
-                # Extract debug info to debug file
-                run("objcopy", ["--only-keep-debug", bin_file, dbg_file])
-                # Strip binary
-                run("strip", ["--strip-debug", "--strip-unneeded", bin_file])
-
-                # Link binary to debug file
-                run("objcopy", [f"--add-gnu-debuglink={dbg_file}", bin_file])
-
-                # find the corresponding .sign file for a .so file and sign it using the pem
-                if os.path.exists(f"{bin_file}.sign"):
-                        if pem_file != "":
-                            print("Signing file: " + bin_file)
-                            run("openssl", ["dgst", "-sha256", "-sign", pem_file, "-out", f"{bin_file}.sign", bin_file])
-                        else:
-                            raise Exception("No private key found for signing the .so file: " + bin_file + "not signing it")
+                # Symlinks point at binaries that are processed on their own
+                if regex.match(file) and not os.path.islink(bin_file):
+                    bin_files.append(bin_file)
+
+    # Look for a private key to sign the .so files, unless one is given in CONAN_DBG_SIGN_KEY
+    pem_file = os.environ.get("CONAN_DBG_SIGN_KEY", "")
+    find_key = not pem_file and any(os.path.exists(f"{bin_file}.sign") for bin_file in bin_files)
+    find_sources = os.environ.get("CONAN_DBG_SOURCES", "all") != "referenced"
+    sources = None
+    if find_key or find_sources:
+        found_sources, found_key = walk_build_folder(conanfile.build_folder, find_sources, find_key)
+        if find_sources:
+            sources = found_sources
+        if found_key:
+            pem_file = found_key
+            print("Found a private key: " + pem_file + "\n not looking for any more keys")
+
+    # Find the corresponding .sign file for a .so file to sign it using the pem
+    sign_files = [bin_file for bin_file in bin_files if os.path.exists(f"{bin_file}.sign")]
+    if sign_files and pem_file == "":
+        raise Exception("No private key found for signing the .so file: " + sign_files[0] + " not signing it")
+
+    cache = DebugCache.from_env()
+    compress = debug_compression(conanfile)
+    dbg_files = []
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs()) as executor:
+        results = executor.map(
+            lambda bin_file: strip_binary(conanfile.package_folder, bin_file, cache, compress),
+            bin_files,
+        )
+        for log, dbg_file in results:
+            for line in log:
+                print(line)
+            if dbg_file:
+                dbg_files.append(dbg_file)
+        print(f"Processed {len(bin_files)} binaries with {jobs()} jobs in {time.monotonic() - start:.2f}s")
+        if cache:
+            cache.evict()
+            print(f"Debug cache: {cache.hits} hits, {cache.misses} misses")
+
+        # Sign stripped binaries, the key is loaded once per package
+        if sign_files:
+            start = time.monotonic()
+            signer = Signer(pem_file)
+            for bin_file in sign_files:
+                print("Signing file: " + bin_file)
+            list(executor.map(signer.sign, sign_files))
+            print(f"Signed {len(sign_files)} files in {time.monotonic() - start:.2f}s")
+
     # Copy sources to package
-    regex = re.compile(r".*\.(c|C|cc|cpp|cxx|c\+\+|h|H|hh|hpp|hxx|h\+\+|rs|y|l)$")
-    for root, _, files in os.walk(conanfile.build_folder):
-        for file in files:
-            if regex.match(file):
-                rel_path = os.path.relpath(root, conanfile.build_folder)
-                file_path = os.path.join(conanfile.build_folder, rel_path, file)
-                file_dest_path = os.path.join(conanfile.package_folder, "src", rel_path, file)
-                if not os.path.exists(os.path.dirname(file_dest_path)):
-                    os.makedirs(os.path.dirname(file_dest_path))
-                shutil.copy(file_path, file_dest_path)
+    if sources is None:
+        try:
+            sources = referenced_sources(conanfile.build_folder, conanfile.name, dbg_files)
+        except ValueError as e:
+            print(f"Cannot read referenced sources, copying all sources: {e}")
+            sources, _ = walk_build_folder(conanfile.build_folder)
+    copy_sources(conanfile.build_folder, os.path.join(conanfile.package_folder, "src"), sources)
 
 
 def pre_upload_package(output, conanfile_path, reference, package_id, remote, **kwargs):
@@ -1,13 +1,19 @@
 import os
+import configparser
 import shutil
 import pathlib
 import glob
+import hashlib
 import re
 import json
+import shlex
 import yaml
 import toml
 import subprocess
 import sys
+import contextlib
+import fcntl
+from collections import namedtuple
 from conans import *
 import conans.client.tools as tools
 
@@ -33,6 +39,38 @@ def env_prepend(var, val, sep=os.pathsep):
     os.environ[var] = val + (sep + os.environ[var] if var in os.environ else "")
 
 
+def env_enabled(var):
+    return os.environ.get(var, "0").lower() in ("1", "true", "yes")
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def link_or_copy(src, dst):
+    # Hardlink when source and destination share a filesystem
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def is_build_output(root, folder, ignored=(".git",)):
+    if folder in ignored:
+        return True
+    # Cargo marks its target directory with a CACHEDIR.TAG
+    return folder == "target" and os.path.exists(os.path.join(root, folder, "CACHEDIR.TAG"))
+
+
 def file_contains(file, strings):
     if isinstance(strings, str):
         strings = [strings]
@@ -44,11 +82,55 @@ def file_contains(file, strings):
     return True
 
 
+# Use the libyaml based loader when available
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_yaml_cache = {}
+
+
+def load_yaml(path):
+    # Parse each file once per process and again only when it changes
+    path = os.path.abspath(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if path in _yaml_cache and _yaml_cache[path][0] == mtime:
+        return _yaml_cache[path][1]
+    with open(path) as yaml_file:
+        data = yaml.load(yaml_file, Loader=YamlLoader)
+    _yaml_cache[path] = (mtime, data)
+    return data
+
+
 def read_metadata(key):
-    metadata = {}
-    if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE) as metadata_file:
-            return yaml.load(metadata_file, Loader=yaml.Loader)[key]
+    metadata = load_yaml(METADATA_FILE)
+    if metadata is not None:
+        return metadata[key]
+
+
+GitInfo = namedtuple("GitInfo", ["commit", "branch"])
+
+_git_info = {}
+
+
+def git_root(path="."):
+    path = os.path.abspath(path)
+    while not os.path.exists(os.path.join(path, ".git")):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+    return path
+
+
+def git_info(path="."):
+    # Get HEAD sha and branch with a single git call per repository
+    root = git_root(path)
+    if root not in _git_info:
+        sha, ref = call("git", ["-C", root or path, "rev-parse", "HEAD", "--abbrev-ref", "HEAD"]).split()
+        _git_info[root] = GitInfo(sha, ref)
+    return _git_info[root]
 
 
 _commit = None
@@ -62,10 +144,9 @@ def commit():
         _commit = os.environ["CI_COMMIT_SHA"]
         return _commit
     if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE) as metadata_file:
-            _commit = yaml.load(metadata_file, Loader=yaml.Loader)["commit"]
-            return _commit
-    _commit = call("git", ["rev-parse", "HEAD"])[:-1]
+        _commit = read_metadata("commit")
+        return _commit
+    _commit = git_info().commit
     return _commit
 
 
@@ -80,36 +161,313 @@ def branch():
         _branch = os.environ["CI_COMMIT_REF_NAME"]
         return _branch[:50]
     if os.path.exists(METADATA_FILE):
-        with open(METADATA_FILE) as metadata_file:
-            _branch = yaml.load(metadata_file, Loader=yaml.Loader)["branch"]
-            return _branch
-    _branch = call("git", ["rev-parse", "--abbrev-ref", "HEAD"])[:-1]
+        _branch = read_metadata("branch")
+        return _branch
+    _branch = git_info().branch
     if _branch == "":
         _branch = "detached-head"
     return _branch[:50]
 
 
+_conan_home = {}
+
+
+def conan_user_home():
+    # Same as conans.paths.get_conan_user_home
+    user_home = os.path.expanduser(os.environ.get("CONAN_USER_HOME", "~"))
+    if not os.path.isabs(user_home):
+        raise Exception(f"Invalid CONAN_USER_HOME value '{user_home}', use an absolute path or one starting with ~/")
+    return os.path.abspath(user_home)
+
+
+def conan_home():
+    # Resolve the Conan home once per CONAN_USER_HOME instead of starting the Conan CLI
+    user_home = conan_user_home()
+    if user_home not in _conan_home:
+        home = os.path.join(user_home, ".conan")
+        if not os.path.exists(os.path.join(home, "conan.conf")):
+            home = call("env", ["-i", sys.argv[0], "config", "home"])[:-1]
+        _conan_home[user_home] = home
+    return _conan_home[user_home]
+
+
+_conan_storage = {}
+
+
+def conan_storage():
+    # Resolve the storage path like ConanClientConfigParser.storage_path
+    home = conan_home()
+    key = (home, os.environ.get("CONAN_STORAGE_PATH"), os.environ.get("CONAN_USER_HOME"))
+    if key not in _conan_storage:
+        path = os.environ.get("CONAN_STORAGE_PATH")
+        if not path:
+            conf = configparser.ConfigParser(interpolation=None)
+            conf.read(os.path.join(home, "conan.conf"))
+            path = conf.get("storage", "path", fallback=None)
+            # Relative paths start from the Conan home, ~/ from CONAN_USER_HOME when it is set
+            if path and path.startswith("."):
+                path = os.path.abspath(os.path.join(home, path))
+            elif path and path[:2] == "~/" and os.environ.get("CONAN_USER_HOME"):
+                path = os.path.join(os.environ["CONAN_USER_HOME"], path[2:])
+        if path:
+            path = os.path.expanduser(path)
+            if not os.path.isabs(path):
+                raise Exception("Conan storage path has to be an absolute path")
+        else:
+            path = call("env", ["-i", sys.argv[0], "config", "get", "storage.path"])[:-1]
+        _conan_storage[key] = path
+    return _conan_storage[key]
+
+
+MESON_OPTION_FILES = ("meson.build", "meson_options.txt", "meson.options")
+
+_meson_options = {}
+
+
+def meson_options(meson_file):
+    # Cache `meson introspect --buildoptions` on disk, keyed by the option sources and the Meson install
+    key = hashlib.sha256()
+    meson_exe = shutil.which("meson")
+    if meson_exe:
+        meson_exe = os.path.realpath(meson_exe)
+        stat = os.stat(meson_exe)
+        key.update(f"{meson_exe}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    source_folder = os.path.dirname(meson_file)
+    for name in MESON_OPTION_FILES:
+        path = os.path.join(source_folder, name)
+        if os.path.exists(path):
+            with open(path, "rb") as option_file:
+                key.update(name.encode("utf-8") + b"\0" + option_file.read())
+    key = key.hexdigest()
+    if key in _meson_options:
+        return _meson_options[key]
+
+    cache_path = os.path.join(conan_home(), "meson_cache", f"{key}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path) as cache_file:
+            opts_data = json.load(cache_file)
+    else:
+        opts_data = json.loads(call("meson", ["introspect", "--buildoptions", meson_file]))
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(opts_data, cache_file)
+        os.replace(tmp_path, cache_path)
+    _meson_options[key] = {opt_data["name"]: opt_data for opt_data in opts_data}
+    return _meson_options[key]
+
+
+MESON_TOKEN_RE = re.compile(
+    r"""(?P<ws>\s+|\#[^\n]*)
+    |(?P<str>'''.*?'''|'(?:[^'\\\n]|\\.)*')
+    |(?P<num>-?\d+)
+    |(?P<id>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op>[()\[\],:])""",
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def _meson_tokens(content):
+    pos = 0
+    while pos < len(content):
+        match = MESON_TOKEN_RE.match(content, pos)
+        if not match:
+            raise ValueError(f"Unexpected character {content[pos]!r}")
+        pos = match.end()
+        if match.lastgroup == "ws":
+            continue
+        value = match.group()
+        if match.lastgroup == "str":
+            value = value[3:-3] if value.startswith("'''") else re.sub(r"\\(.)", r"\1", value[1:-1])
+        elif match.lastgroup == "num":
+            value = int(value)
+        elif value in ("true", "false"):
+            value = value == "true"
+        yield match.lastgroup, value
+
+
+def parse_meson_options(source_folder):
+    # Read option names, types and choices from the options file without starting Meson.
+    # Returns None for constructs that need a real Meson introspection.
+    for name in ("meson.options", "meson_options.txt"):
+        path = os.path.join(source_folder, name)
+        if os.path.exists(path):
+            break
+    else:
+        return {}
+    with open(path, encoding="utf-8") as option_file:
+        content = option_file.read()
+
+    def value(tokens, token):
+        if token == ("op", "["):
+            values = []
+            token = next(tokens)
+            while token != ("op", "]"):
+                values.append(value(tokens, token))
+                token = next(tokens)
+                if token == ("op", ","):
+                    token = next(tokens)
+            return values
+        if token[0] in ("str", "num") or isinstance(token[1], bool):
+            return token[1]
+        raise ValueError(f"Unsupported value {token[1]!r}")
+
+    opts_data = {}
+    try:
+        tokens = _meson_tokens(content)
+        for token in tokens:
+            if token != ("id", "option") or next(tokens) != ("op", "("):
+                raise ValueError(f"Unsupported statement {token[1]!r}")
+            kind, opt_name = next(tokens)
+            if kind != "str":
+                raise ValueError("Option name is not a string")
+            kwargs = {}
+            token = next(tokens)
+            while token != ("op", ")"):
+                if token == ("op", ","):
+                    token = next(tokens)
+                    continue
+                if token[0] != "id" or next(tokens) != ("op", ":"):
+                    raise ValueError(f"Unsupported argument {token[1]!r}")
+                kwargs[token[1]] = value(tokens, next(tokens))
+                token = next(tokens)
+            opt_data = {"name": opt_name, "type": kwargs.get("type")}
+            # Meson reports feature options as combos
+            if opt_data["type"] == "feature":
+                opt_data["type"] = "combo"
+                opt_data["choices"] = ["enabled", "disabled", "auto"]
+            elif "choices" in kwargs:
+                opt_data["choices"] = kwargs["choices"]
+            opts_data[opt_name] = opt_data
+    except (StopIteration, ValueError):
+        return None
+    return opts_data
+
+
+def build_jobs():
+    # Job budget shared by make, ninja and cargo, Conan's cpu_count honours CONAN_CPU_COUNT and cgroup limits
+    return int(tools.cpu_count())
+
+
+def load_args():
+    # Don't start new make/ninja jobs while the load is above the budget, so parallel package builds share it
+    return [f"-l{build_jobs()}"]
+
+
+CARGO_LIB_KINDS = frozenset(("lib", "rlib", "dylib", "cdylib", "staticlib", "proc-macro"))
+# Artifacts of the cargo builds of a recipe, staged and recorded in the build folder
+CARGO_ARTIFACTS_FILE = "cargo_artifacts.json"
+# Folders of a package that cargo auto-discovers targets in
+CARGO_TARGET_FOLDERS = ("src", os.path.join("src", "bin"), "examples", "tests", "benches")
+CARGO_ARTIFACTS_FOLDER = "cargo_artifacts"
+
+
+_cargo_metadata = {}
+
+
+def _manifest_stats(paths):
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stats[path] = [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            stats[path] = None
+    return stats
+
+
+def cargo_metadata(cargo_toml):
+    # Cache `cargo metadata --no-deps` for the Conan process. Entries are reused while the manifests and
+    # lock files of the package, its parent folders (workspace) and all listed packages, the target folders
+    # of the packages and the existence of their target sources are unchanged.
+    cargo_toml = os.path.abspath(cargo_toml)
+    key = f"{cargo_toml}:{os.environ.get('CARGO_TARGET_DIR', '')}"
+    cached = _cargo_metadata.get(key)
+    if (
+        cached
+        and _manifest_stats(cached["stats"]) == cached["stats"]
+        and {path: os.path.exists(path) for path in cached["sources"]} == cached["sources"]
+    ):
+        return cached["metadata"]
+
+    metadata = json.loads(
+        call("cargo", ["metadata", "--format-version=1", "--no-deps", "--manifest-path", cargo_toml])
+    )
+    paths = []
+    sources = {}
+    for package in metadata["packages"]:
+        paths.append(package["manifest_path"])
+        # Folders cargo discovers targets in, adding or removing a target changes their mtime
+        package_folder = os.path.dirname(package["manifest_path"])
+        paths += [os.path.join(package_folder, folder) for folder in CARGO_TARGET_FOLDERS]
+        for target in package["targets"]:
+            sources[target["src_path"]] = os.path.exists(target["src_path"])
+    folder = os.path.dirname(cargo_toml)
+    while True:
+        paths += [os.path.join(folder, "Cargo.toml"), os.path.join(folder, "Cargo.lock")]
+        if os.path.dirname(folder) == folder:
+            break
+        folder = os.path.dirname(folder)
+    _cargo_metadata[key] = {"stats": _manifest_stats(sorted(set(paths))), "sources": sources, "metadata": metadata}
+    return metadata
+
+
+def cargo_own_manifests(cargo_toml):
+    # Manifests of the packages cargo builds in the folder of cargo_toml: the package itself, or the default
+    # members of a virtual workspace. Path dependencies are built too but belong to their own recipes.
+    cargo_toml = os.path.abspath(cargo_toml)
+    metadata = cargo_metadata(cargo_toml)
+    manifests = {os.path.abspath(package["manifest_path"]): package["id"] for package in metadata["packages"]}
+    if cargo_toml in manifests:
+        return {cargo_toml}
+    members = metadata.get("workspace_default_members") or metadata["workspace_members"]
+    return {path for path, package_id in manifests.items() if package_id in members}
+
+
+COMPILER_CACHES = ("ccache", "sccache")
+
+
+def compiler_cache():
+    # Opt-in compiler cache, set CONAN_COMPILER_CACHE to ccache or sccache (e.g. in the profile [env])
+    launcher = os.environ.get("CONAN_COMPILER_CACHE")
+    if not launcher:
+        return None
+    if launcher not in COMPILER_CACHES:
+        raise Exception(f"Invalid compiler cache: {launcher}")
+    return launcher
+
+
+def compiler_cache_stats(launcher):
+    # Return cache hits and misses, or None if the statistics cannot be read
+    try:
+        if launcher == "sccache":
+            stats = json.loads(call("sccache", ["--show-stats", "--stats-format=json"]))["stats"]
+            return (
+                sum(stats["cache_hits"]["counts"].values()),
+                sum(stats["cache_misses"]["counts"].values()),
+            )
+        stats = dict(line.split("\t", 1) for line in call("ccache", ["--print-stats"]).splitlines() if "\t" in line)
+        return (
+            int(stats.get("direct_cache_hit", 0)) + int(stats.get("preprocessed_cache_hit", 0)),
+            int(stats.get("cache_miss", 0)),
+        )
+    except (RuntimeError, ValueError, KeyError):
+        return None
+
+
 class Recipe(ConanFile):
     settings = "build_type", "arch", "os", "libc"
     options = {"shared": [True, False]}
     default_options = {"shared": True}
-    _conan_home = None
-    _conan_storage = None
     requires = (("generators/[^1.0.0]", "private"),)
 
     @property
     def conan_home(self):
-        if self._conan_home:
-            return self._conan_home
-        self._conan_home = call("env", ["-i", sys.argv[0], "config", "home"])[:-1]
-        return self._conan_home
+        return conan_home()
 
     @property
     def conan_storage(self):
-        if self._conan_storage:
-            return self._conan_storage
-        self._conan_storage = call("env", ["-i", sys.argv[0], "config", "get", "storage.path"])[:-1]
-        return self._conan_storage
+        return conan_storage()
 
     def set_name(self):
         os.environ["ORIGIN_FOLDER"] = self.recipe_folder
@@ -117,13 +475,10 @@ class Recipe(ConanFile):
         if self.name:
             return
         # Get name from devops.yml
-        conf_path = os.path.join(self.recipe_folder, DEVOPS_FILE)
-        if os.path.exists(conf_path):
-            with open(conf_path, "r") as conf_file:
-                conf = yaml.safe_load(conf_file)
-                if conf[0] and "name" in conf[0]:
-                    self.name = conf[0]["name"]
-                    return
+        conf = load_yaml(os.path.join(self.recipe_folder, DEVOPS_FILE))
+        if conf is not None and conf[0] and "name" in conf[0]:
+            self.name = conf[0]["name"]
+            return
         # Get name from folder
         self.name = os.path.basename(self.recipe_folder)
 
@@ -132,40 +487,96 @@ class Recipe(ConanFile):
         if self.version:
             return
         # Get version from devops.yml
-        conf_path = os.path.join(self.recipe_folder, DEVOPS_FILE)
-        if os.path.exists(conf_path):
-            with open(conf_path, "r") as conf_file:
-                conf = yaml.safe_load(conf_file)
-                if conf[0] and "version" in conf[0]:
-                    self.version = conf[0]["version"]
-                    return
+        conf = load_yaml(os.path.join(self.recipe_folder, DEVOPS_FILE))
+        if conf is not None and conf[0] and "version" in conf[0]:
+            self.version = conf[0]["version"]
+            return
         # Get version from git
         self.version = commit()
 
+    @property
+    def prefix_map_flags(self):
+        # Map the build folder, and its canonical path if it differs, to the package name.
+        # CONAN_FILE_PREFIX_MAP=1 also maps __FILE__ and friends for reproducible objects.
+        if env_enabled("CONAN_FILE_PREFIX_MAP"):
+            option = "-ffile-prefix-map"
+        else:
+            option = "-fdebug-prefix-map"
+        folders = [self.build_folder]
+        if os.path.realpath(self.build_folder) != self.build_folder:
+            folders.append(os.path.realpath(self.build_folder))
+        return [f"{option}={folder}={self.name}" for folder in folders]
+
     def set_env(self):
-        env_prepend(
-            "CFLAGS",
-            "-fdebug-prefix-map=%s=%s" % (self.build_folder, self.name),
-            " ",
-        )
-        env_prepend(
-            "CXXFLAGS",
-            "-fdebug-prefix-map=%s=%s" % (self.build_folder, self.name),
-            " ",
-        )
+        # Only add missing flags, set_env is called by every build helper
+        for var in ("CFLAGS", "CXXFLAGS"):
+            current = os.environ.get(var, "").split()
+            flags = [flag for flag in self.prefix_map_flags if flag not in current]
+            if flags:
+                env_prepend(var, " ".join(flags), " ")
         # Don't run husky in conan/cicd
         os.environ["CARGO_HUSKY_DONT_INSTALL_HOOKS"] = "true"
+        # Compiler cache statistics before building, see report_compiler_cache
+        launcher = self.compiler_launcher
+        self._compiler_cache_stats = None
+        if launcher:
+            with tools.environment_append(self.compiler_cache_env(compilers=False)):
+                self._compiler_cache_stats = compiler_cache_stats(launcher)
+
+    @property
+    def compiler_launcher(self):
+        # Resolve the compiler cache once per recipe, set_env and every build helper use it
+        if not hasattr(self, "_compiler_launcher"):
+            launcher = compiler_cache()
+            if launcher and not shutil.which(launcher):
+                self.output.warn(f"Compiler cache '{launcher}' not found, building without it")
+                launcher = None
+            self._compiler_launcher = launcher
+        return self._compiler_launcher
+
+    def compiler_cache_env(self, compilers=True):
+        launcher = self.compiler_launcher
+        if not launcher:
+            return {}
+        env = {}
+        if launcher == "ccache":
+            env["CCACHE_DIR"] = os.environ.get("CCACHE_DIR", os.path.join(conan_home(), "ccache"))
+            # Rewrite paths in the unique build folder to relative ones, so other build folders hit the cache
+            env["CCACHE_BASEDIR"] = os.environ.get("CCACHE_BASEDIR", os.path.realpath(self.build_folder))
+        else:
+            env["SCCACHE_DIR"] = os.environ.get("SCCACHE_DIR", os.path.join(conan_home(), "sccache"))
+            env["RUSTC_WRAPPER"] = launcher
+        # CMake uses CMAKE_<LANG>_COMPILER_LAUNCHER instead
+        if compilers:
+            for var, default in (("CC", "cc"), ("CXX", "c++")):
+                compiler = os.environ.get(var, default)
+                if not compiler.startswith(f"{launcher} "):
+                    env[var] = f"{launcher} {compiler}"
+        return env
+
+    def report_compiler_cache(self):
+        launcher = self.compiler_launcher
+        if not launcher or not getattr(self, "_compiler_cache_stats", None):
+            return
+        with tools.environment_append(self.compiler_cache_env(compilers=False)):
+            stats = compiler_cache_stats(launcher)
+        if not stats:
+            return
+        hits = stats[0] - self._compiler_cache_stats[0]
+        misses = stats[1] - self._compiler_cache_stats[1]
+        if hits + misses:
+            self.output.info(f"{launcher}: {hits} hits, {misses} misses ({100 * hits / (hits + misses):.0f}% hit rate)")
 
     @property
     def src(self):
         return f"{self.name}-{self.version}.src"
 
-    def exe(self, command, args=None, cwd=None):
+    def exe(self, command, args=None, cwd=None, output=True):
         if not args:
             args = []
         if not cwd:
             cwd = self.src
-        self.run(f"{command} {' '.join(args)}", cwd=cwd)
+        self.run(f"{command} {' '.join(args)}", output=output, cwd=cwd)
 
     def download(self, url, filename, dest_folder=None):
         if not dest_folder:
@@ -240,12 +651,12 @@ class Recipe(ConanFile):
         if not os.path.exists(meson_file):
             raise Exception(f"meson.build not found: {meson_file}")
         if opt_check:
-            opts_data = json.loads(call("meson", ["introspect", "--buildoptions", meson_file]))
+            opts_data = parse_meson_options(source_folder)
+            # Built-in and unparsable options need Meson itself
+            if opts_data is None or any(opt_name not in opts_data for opt_name in opts):
+                opts_data = meson_options(meson_file)
             for opt_name, opt_val in opts.items():
-                opt_data = next(
-                    (opt_data for opt_data in opts_data if opt_name == opt_data["name"]),
-                    None,
-                )
+                opt_data = opts_data.get(opt_name)
                 if not opt_data:
                     raise Exception(f"Unrecognized Meson option: {opt_name}")
                 # Value checking
@@ -280,14 +691,16 @@ class Recipe(ConanFile):
                     opt_val = "false"
                 args.append(f"-D{opt_name}={opt_val}")
 
-        meson = Meson(self)
-        meson.configure(
-            args,
-            build_folder=os.path.join(source_folder, ".build_folder"),
-            source_folder=source_folder,
-            pkg_config_paths=os.environ["PKG_CONFIG_PATH"].split(":"),
-        )
-        meson.install()
+        with tools.environment_append(self.compiler_cache_env()):
+            meson = Meson(self)
+            meson.configure(
+                args,
+                build_folder=os.path.join(source_folder, ".build_folder"),
+                source_folder=source_folder,
+                pkg_config_paths=os.environ["PKG_CONFIG_PATH"].split(":"),
+            )
+            meson.install(args=load_args())
+        self.report_compiler_cache()
 
     def cmake(
         self,
@@ -303,18 +716,28 @@ class Recipe(ConanFile):
         if targets is str:
             targets = [targets]
         cmake = CMake(self)
+        launcher = self.compiler_launcher
+        if launcher:
+            cmake.definitions["CMAKE_C_COMPILER_LAUNCHER"] = launcher
+            cmake.definitions["CMAKE_CXX_COMPILER_LAUNCHER"] = launcher
         for key, val in defs.items():
             cmake.definitions[key] = val
         if source_folder is None:
             source_folder = self.src
-        cmake.configure(source_folder=source_folder, build_folder=build_folder)
-        if targets:
-            for target in targets:
-                cmake.build(target=target)
-        else:
-            cmake.build()
-            if install:
-                cmake.install()
+        # Arguments after -- go to make/ninja, Conan appends its -j there
+        args = []
+        if cmake.generator and ("Makefiles" in cmake.generator or "Ninja" in cmake.generator):
+            args = ["--"] + load_args()
+        with tools.environment_append(self.compiler_cache_env(compilers=False)):
+            cmake.configure(source_folder=source_folder, build_folder=build_folder)
+            if targets:
+                for target in targets:
+                    cmake.build(args=args, target=target)
+            else:
+                cmake.build(args=args)
+                if install:
+                    cmake.install(args=args)
+        self.report_compiler_cache()
 
     def setuptools(self, source_folder=None):
         self.set_env()
@@ -356,7 +779,7 @@ class Recipe(ConanFile):
             source_folder = self.src
         if env is None:
             env = {}
-        with tools.environment_append(env):
+        with tools.environment_append({**self.compiler_cache_env(), **env}):
             files = tuple(os.listdir(source_folder))
             if "configure" not in files:
                 # Don't run configure twice
@@ -386,12 +809,14 @@ class Recipe(ConanFile):
                 build_folder = "."
             else:
                 build_folder = source_folder
+            make_args = make_args + load_args()
             with tools.chdir(build_folder):
                 if target:
                     autotools.make(make_args, target=target)
                 else:
                     autotools.make(make_args)
                     autotools.install(make_args)
+        self.report_compiler_cache()
 
     def make(self, args=None, source_folder=None, target="", env=None):
         self.set_env()
@@ -401,28 +826,137 @@ class Recipe(ConanFile):
             source_folder = self.src
         if env is None:
             env = {}
-        with tools.chdir(source_folder), tools.environment_append(env):
+        with tools.chdir(source_folder), tools.environment_append({**self.compiler_cache_env(), **env}):
             autotools = AutoToolsBuildEnvironment(self)
+            args = args + load_args()
             if target:
                 autotools.make(args, target=target)
             else:
                 autotools.make(args)
                 autotools.install(args)
+        self.report_compiler_cache()
+
+    @property
+    def cargo_target_dir(self):
+        # Opt-in target directory shared by Rust recipes with the same toolchain and settings
+        if not env_enabled("CONAN_CARGO_SHARED_TARGET"):
+            return None
+        key = "-".join(
+            str(self.settings.get_safe(name) or "any") for name in ("rust", "os", "arch", "libc", "build_type")
+        )
+        return os.path.join(conan_home(), "cargo_target", key)
+
+    @contextlib.contextmanager
+    def cargo_target_lock(self):
+        # Keep builds and packaging of recipes sharing a target directory apart
+        if not self.cargo_target_dir:
+            yield
+            return
+        with file_lock(f"{self.cargo_target_dir}.lock"):
+            yield
 
     def cargo(self, args=None, source_folder=None, clean=None, test=True):
         self.set_env()
         if args is None:
             args = []
-        if clean:
-            for pkg in clean:
-                self.exe("cargo clean -p", [pkg])
         if self.settings.build_type in ("Release", "RelWithDebInfo"):
             args.append("--release")
         if source_folder is None:
             source_folder = self.src
-        self.exe("cargo build", args)
-        if test:
-            self.exe("cargo test", args)
+        jobs = build_jobs()
+        args = args + [f"-j{jobs}"]
+        env = {"CARGO_BUILD_JOBS": str(jobs), "RUST_TEST_THREADS": str(jobs)}
+        if self.cargo_target_dir:
+            env["CARGO_TARGET_DIR"] = self.cargo_target_dir
+        # Run tests only for one build type per pipeline when CONAN_CARGO_TEST_BUILD_TYPE is set
+        test_build_type = os.environ.get("CONAN_CARGO_TEST_BUILD_TYPE")
+        if test_build_type and test_build_type != str(self.settings.build_type):
+            test = False
+        with tools.environment_append({**self.compiler_cache_env(compilers=False), **env}), self.cargo_target_lock():
+            if clean:
+                for pkg in clean:
+                    self.exe("cargo clean -p", [pkg])
+            if test and os.environ.get("CONAN_CARGO_TEST_MODE") == "single":
+                self.cargo_build_and_test(args, source_folder)
+            else:
+                self.cargo_build(args)
+                if test:
+                    self.exe("cargo test", args)
+        self.report_compiler_cache()
+
+    def cargo_build(self, args, cwd=None):
+        # Build and record the cdylibs, dylibs and bins of the recipe's own packages that cargo reports as compiler
+        # artifacts. The JSON messages are read from stdout while build output and diagnostics are passed through.
+        cwd = cwd or self.src
+        manifests = cargo_own_manifests(os.path.join(cwd, "Cargo.toml"))
+        command = ["cargo", "build", "--message-format=json-render-diagnostics"] + shlex.split(" ".join(args))
+        print(" ".join(command), flush=True)
+        artifacts = []
+        with subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, text=True) as child:
+            for line in child.stdout:
+                try:
+                    message = json.loads(line) if line.startswith("{") else None
+                except ValueError:
+                    message = None
+                if message is None:
+                    print(line, end="", flush=True)
+                    continue
+                if message.get("reason") != "compiler-artifact" or message["profile"]["test"]:
+                    continue
+                if os.path.abspath(message["manifest_path"]) not in manifests:
+                    continue
+                kinds = message["target"]["kind"]
+                if "bin" in kinds and message.get("executable"):
+                    artifacts.append([message["executable"], "bin"])
+                    continue
+                kind = next((kind for kind in ("cdylib", "dylib") if kind in kinds), None)
+                if kind:
+                    artifacts += [[filename, kind] for filename in message["filenames"] if filename.endswith(".so")]
+        if child.returncode != 0:
+            raise RuntimeError(f"Error {child.returncode} while executing {' '.join(command)}")
+        self.record_cargo_artifacts(artifacts)
+
+    def record_cargo_artifacts(self, artifacts):
+        # Stage the artifacts into the build folder while cargo_target_lock() is held, so that later builds in a
+        # shared target directory cannot replace them before packaging. Records of earlier builds are kept.
+        artifacts_path = os.path.join(self.build_folder, CARGO_ARTIFACTS_FILE)
+        records = []
+        if os.path.exists(artifacts_path):
+            with open(artifacts_path) as artifacts_file:
+                records = json.load(artifacts_file)
+        for path, kind in artifacts:
+            staged_path = os.path.join(CARGO_ARTIFACTS_FOLDER, kind, os.path.basename(path))
+            os.makedirs(os.path.join(self.build_folder, os.path.dirname(staged_path)), exist_ok=True)
+            link_or_copy(path, os.path.join(self.build_folder, staged_path))
+            if [staged_path, kind] not in records:
+                records.append([staged_path, kind])
+        with open(artifacts_path, "w") as artifacts_file:
+            json.dump(records, artifacts_file)
+
+    def cargo_build_and_test(self, args, source_folder):
+        cargo_toml = os.path.abspath(os.path.join(source_folder, "Cargo.toml"))
+        kinds = set()
+        for package in cargo_metadata(cargo_toml)["packages"]:
+            if os.path.abspath(package["manifest_path"]) == cargo_toml:
+                for target in package["targets"]:
+                    kinds.update(target["kind"])
+        has_lib = bool(kinds & CARGO_LIB_KINDS)
+        # Build the targets cargo test and nextest build in one invocation, so dependencies are only compiled once
+        build_args = ["--tests"]
+        if has_lib:
+            build_args.append("--lib")
+        if "bin" in kinds:
+            build_args.append("--bins")
+        if "example" in kinds:
+            build_args.append("--examples")
+        self.cargo_build(args + build_args, cwd=source_folder)
+        if shutil.which("cargo-nextest"):
+            # nextest runs every test in its own process, in parallel across test binaries
+            self.exe("cargo nextest run", args, cwd=source_folder)
+            if has_lib:
+                self.exe("cargo test --doc", args, cwd=source_folder)
+        else:
+            self.exe("cargo test", args, cwd=source_folder)
 
 
 class RustRecipe(Recipe):
@@ -444,40 +978,56 @@ class RustRecipe(Recipe):
         if os.path.exists(rustfmt_toml):
             self.copy("rustfmt.toml", src=os.path.dirname(rustfmt_toml), dst=".", keep_path=True)
 
-    def package(self):
+    # Folder for cdylib targets in the package
+    cdylib_folder = "lib"
+
+    def cargo_artifacts(self):
+        # Return (artifact path, package folder) of all cdylibs, dylibs and bins of the Cargo project
         cargo_toml = os.path.join(self.src, "Cargo.toml")
         if not os.path.exists(cargo_toml):
-            return
-
-        metadata_raw = call(
-            "cargo", ["metadata", "--format-version=1", "--no-deps", "--manifest-path", cargo_toml]
-        )
-        metadata = json.loads(metadata_raw)
-        target_folder = metadata["target_directory"]
+            return []
+        with tools.environment_append({"CARGO_TARGET_DIR": self.cargo_target_dir} if self.cargo_target_dir else {}):
+            metadata = cargo_metadata(cargo_toml)
+        target_folder = self.cargo_target_dir or metadata["target_directory"]
+        if self.settings.build_type in ("Release", "RelWithDebInfo"):
+            build_dir = "release"
+        else:
+            build_dir = "debug"
 
-        # Automatically add cdylibs and bins
+        artifacts = []
         for package in metadata["packages"]:
             for target in package["targets"]:
-                if "cdylib" in target["kind"] or "dylib" in target["kind"]:
+                if "cdylib" in target["kind"]:
+                    name = target["name"].replace("-", "_")
+                    artifacts.append((f"lib{name}.so", self.cdylib_folder))
+                elif "dylib" in target["kind"]:
                     name = target["name"].replace("-", "_")
-                    target = f"lib{name}.so"
-                    dest_folder = "lib"
+                    artifacts.append((f"lib{name}.so", "lib"))
                 elif "bin" in target["kind"]:
-                    target = target["name"]
-                    dest_folder = "bin"
-                else:
-                    continue
+                    artifacts.append((target["name"], "bin"))
+        return [(os.path.join(target_folder, build_dir, target), dest_folder) for target, dest_folder in artifacts]
 
-                if self.settings.build_type in ("Release", "RelWithDebInfo"):
-                    build_dir = "release"
-                else:
-                    build_dir = "debug"
-                target_path = os.path.join(target_folder, build_dir, target)
-                dest_path = os.path.join(self.package_folder, dest_folder)
-                if not os.path.exists(dest_path):
-                    os.makedirs(dest_path)
-                if os.path.exists(target_path):
-                    shutil.copy(target_path, os.path.join(dest_path, target))
+    def package(self):
+        # Add exactly the cdylibs and bins the cargo build staged, else guess them from cargo metadata
+        artifacts_path = os.path.join(self.build_folder, CARGO_ARTIFACTS_FILE)
+        if os.path.exists(artifacts_path):
+            with open(artifacts_path) as artifacts_file:
+                folders = {"cdylib": self.cdylib_folder, "dylib": "lib", "bin": "bin"}
+                self.package_cargo_artifacts(
+                    [(os.path.join(self.build_folder, path), folders[kind]) for path, kind in json.load(artifacts_file)]
+                )
+        else:
+            with self.cargo_target_lock():
+                self.package_cargo_artifacts(
+                    [(path, folder) for path, folder in self.cargo_artifacts() if os.path.exists(path)]
+                )
+
+    def package_cargo_artifacts(self, artifacts):
+        for target_path, dest_folder in artifacts:
+            dest_path = os.path.join(self.package_folder, dest_folder)
+            if not os.path.exists(dest_path):
+                os.makedirs(dest_path)
+            link_or_copy(target_path, os.path.join(dest_path, os.path.basename(target_path)))
 
 
 class CppRecipe(Recipe):
@@ -536,41 +1086,5 @@ class RustProject(Project, RustRecipe):
 
 
 class GstRustProject(GstProject, RustProject):
-    def package(self):
-        cargo_toml = os.path.join(self.src, "Cargo.toml")
-        if not os.path.exists(cargo_toml):
-            return
-
-        metadata_raw = call(
-            "cargo", ["metadata", "--format-version=1", "--no-deps", "--manifest-path", cargo_toml]
-        )
-        metadata = json.loads(metadata_raw)
-        target_folder = metadata["target_directory"]
-
-        # (Copy gstreamer elements to lib/streamer-1.0)
-        for package in metadata["packages"]:
-            for target in package["targets"]:
-                if "cdylib" in target["kind"]:
-                    name = target["name"].replace("-", "_")
-                    target = f"lib{name}.so"
-                    dest_folder = os.path.join("lib", "gstreamer-1.0")
-                elif "dylib" in target["kind"]:
-                    name = target["name"].replace("-", "_")
-                    target = f"lib{name}.so"
-                    dest_folder = "lib"
-                elif "bin" in target["kind"]:
-                    target = target["name"]
-                    dest_folder = "bin"
-                else:
-                    continue
-
-                if self.settings.build_type in ("Release", "RelWithDebInfo"):
-                    build_dir = "release"
-                else:
-                    build_dir = "debug"
-                target_path = os.path.join(target_folder, build_dir, target)
-                dest_path = os.path.join(self.package_folder, dest_folder)
-                if not os.path.exists(dest_path):
-                    os.makedirs(dest_path)
-                if os.path.exists(target_path):
-                    shutil.copy(target_path, os.path.join(dest_path, target))
+    # Copy gstreamer elements to lib/gstreamer-1.0
+    cdylib_folder = os.path.join("lib", "gstreamer-1.0")
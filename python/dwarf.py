@@ -0,0 +1,300 @@
+import os
+import struct
+
+import elf
+
+DEBUG_SECTIONS = (".debug_info", ".debug_abbrev", ".debug_line", ".debug_str", ".debug_line_str", ".debug_str_offsets")
+
+DW_AT_name = 0x03
+DW_AT_stmt_list = 0x10
+DW_AT_comp_dir = 0x1B
+DW_AT_str_offsets_base = 0x72
+
+DW_UT_compile = 0x01
+DW_UT_partial = 0x03
+DW_UT_skeleton = 0x04
+
+DW_LNCT_path = 0x1
+DW_LNCT_directory_index = 0x2
+
+DW_FORM_implicit_const = 0x21
+DW_FORM_indirect = 0x16
+
+# Forms resolved to strings
+STRING_FORMS = {0x08, 0x0E, 0x1A, 0x1D, 0x1F, 0x25, 0x26, 0x27, 0x28, 0x1F02, 0x1F21}
+# String forms that point into a supplementary object file (dwz)
+SUPPLEMENTARY_STRING_FORMS = {0x1D, 0x1F21}
+# Forms with a fixed size, -1 is the offset size, -2 the address size
+FIXED_FORMS = {
+    0x01: -2,  # addr
+    0x05: 2,  # data2
+    0x06: 4,  # data4
+    0x07: 8,  # data8
+    0x0B: 1,  # data1
+    0x0C: 1,  # flag
+    0x0E: -1,  # strp
+    0x11: 1,  # ref1
+    0x12: 2,  # ref2
+    0x13: 4,  # ref4
+    0x14: 8,  # ref8
+    0x17: -1,  # sec_offset
+    0x19: 0,  # flag_present
+    0x1C: 4,  # ref_sup4
+    0x1D: -1,  # strp_sup
+    0x1E: 16,  # data16
+    0x1F: -1,  # line_strp
+    0x20: 8,  # ref_sig8
+    0x21: 0,  # implicit_const
+    0x24: 8,  # ref_sup8
+    0x25: 1,  # strx1
+    0x26: 2,  # strx2
+    0x27: 3,  # strx3
+    0x28: 4,  # strx4
+    0x29: 1,  # addrx1
+    0x2A: 2,  # addrx2
+    0x2B: 3,  # addrx3
+    0x2C: 4,  # addrx4
+    0x1F20: -1,  # GNU_ref_alt
+    0x1F21: -1,  # GNU_strp_alt
+}
+# Forms encoded as ULEB128
+ULEB_FORMS = {0x0F, 0x15, 0x1A, 0x1B, 0x22, 0x23, 0x1F01, 0x1F02}
+# Blocks prefixed by their length
+BLOCK_FORMS = {0x03: 2, 0x04: 4, 0x09: 0, 0x0A: 1, 0x18: 0}
+
+
+class Reader:
+    def __init__(self, data, pos=0, endian="<"):
+        self.data = data
+        self.pos = pos
+        self.endian = endian
+        self.offset_size = 4
+        self.address_size = 8
+        self.version = 4
+
+    def uint(self, size):
+        value = int.from_bytes(self.data[self.pos : self.pos + size], "little" if self.endian == "<" else "big")
+        self.pos += size
+        return value
+
+    def uleb(self):
+        value = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def sleb(self):
+        value = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                if byte & 0x40:
+                    value -= 1 << shift
+                return value
+
+    def cstr(self):
+        end = self.data.index(b"\0", self.pos)
+        value = self.data[self.pos : end].decode("utf-8", "replace")
+        self.pos = end + 1
+        return value
+
+    def unit_length(self):
+        length = self.uint(4)
+        if length == 0xFFFFFFFF:
+            self.offset_size = 8
+            return self.uint(8)
+        self.offset_size = 4
+        return length
+
+    def form(self, form, implicit_const=None):
+        """Read an attribute value, references to string tables are returned as (form, offset)"""
+        if form == DW_FORM_indirect:
+            return self.form(self.uleb())
+        if form == DW_FORM_implicit_const:
+            return implicit_const
+        if form == 0x08:
+            return self.cstr()
+        if form == 0x0D:
+            return self.sleb()
+        if form in ULEB_FORMS:
+            value = self.uleb()
+        elif form in FIXED_FORMS:
+            size = FIXED_FORMS[form]
+            if size == -1:
+                size = self.offset_size
+            elif size == -2:
+                size = self.address_size
+            value = self.uint(size)
+        elif form == 0x10:  # ref_addr
+            value = self.uint(self.address_size if self.version == 2 else self.offset_size)
+        elif form in BLOCK_FORMS:
+            size = BLOCK_FORMS[form]
+            length = self.uint(size) if size else self.uleb()
+            value = self.data[self.pos : self.pos + length]
+            self.pos += length
+        else:
+            raise ValueError(f"Unsupported DWARF form 0x{form:x}")
+        if form in STRING_FORMS:
+            return (form, value)
+        return value
+
+
+class Strings:
+    def __init__(self, sections, endian):
+        self.sections = sections
+        self.endian = endian
+
+    def resolve(self, value, str_offsets_base=8, offset_size=4):
+        if value is None or isinstance(value, str):
+            return value
+        if not isinstance(value, tuple):
+            raise ValueError(f"Expected a string attribute, got {type(value).__name__}")
+        form, offset = value
+        if form in SUPPLEMENTARY_STRING_FORMS:
+            raise ValueError(f"String form 0x{form:x} refers to a supplementary object file")
+        if form == 0x1F:
+            table = self.sections.get(".debug_line_str", b"")
+        else:
+            table = self.sections.get(".debug_str", b"")
+            if form != 0x0E:
+                # strx forms index into .debug_str_offsets
+                offsets = Reader(self.sections.get(".debug_str_offsets", b""), str_offsets_base + offset * offset_size, self.endian)
+                offset = offsets.uint(offset_size)
+        return Reader(table, offset).cstr()
+
+
+def _abbrevs(data, offset):
+    reader = Reader(data, offset)
+    abbrevs = {}
+    while True:
+        code = reader.uleb()
+        if code == 0:
+            return abbrevs
+        reader.uleb()  # tag
+        reader.pos += 1  # children
+        attrs = []
+        while True:
+            attr, form = reader.uleb(), reader.uleb()
+            if attr == 0 and form == 0:
+                break
+            attrs.append((attr, form, reader.sleb() if form == DW_FORM_implicit_const else None))
+        abbrevs[code] = attrs
+
+
+def _compile_units(sections, endian):
+    """Yield name, comp_dir, stmt_list and string offsets base of every compile unit"""
+    info = sections.get(".debug_info", b"")
+    strings = Strings(sections, endian)
+    abbrev_cache = {}
+    pos = 0
+    while pos < len(info):
+        reader = Reader(info, pos, endian)
+        length = reader.unit_length()
+        end = reader.pos + length
+        reader.version = reader.uint(2)
+        unit_type = DW_UT_compile
+        if reader.version >= 5:
+            unit_type = reader.uint(1)
+            reader.address_size = reader.uint(1)
+            abbrev_offset = reader.uint(reader.offset_size)
+            if unit_type == DW_UT_skeleton:
+                reader.pos += 8
+        else:
+            abbrev_offset = reader.uint(reader.offset_size)
+            reader.address_size = reader.uint(1)
+        pos = end
+        if unit_type not in (DW_UT_compile, DW_UT_partial, DW_UT_skeleton):
+            continue
+        if abbrev_offset not in abbrev_cache:
+            abbrev_cache[abbrev_offset] = _abbrevs(sections[".debug_abbrev"], abbrev_offset)
+        code = reader.uleb()
+        if code == 0:
+            continue
+        values = {}
+        for attr, form, implicit_const in abbrev_cache[abbrev_offset][code]:
+            values[attr] = reader.form(form, implicit_const)
+        base = values.get(DW_AT_str_offsets_base, 8)
+        name = strings.resolve(values.get(DW_AT_name), base, reader.offset_size)
+        comp_dir = strings.resolve(values.get(DW_AT_comp_dir), base, reader.offset_size)
+        yield name, comp_dir or "", values.get(DW_AT_stmt_list), base
+
+
+def _line_files(sections, endian, offset, comp_dir, str_offsets_base):
+    """Return the file names of the line program header at offset"""
+    reader = Reader(sections.get(".debug_line", b""), offset, endian)
+    strings = Strings(sections, endian)
+    reader.unit_length()
+    reader.version = reader.uint(2)
+    if reader.version >= 5:
+        reader.address_size = reader.uint(1)
+        reader.pos += 1  # segment_selector_size
+    reader.uint(reader.offset_size)  # header_length
+    reader.pos += 5 if reader.version >= 4 else 4
+    opcode_base = reader.uint(1)
+    reader.pos += opcode_base - 1
+
+    def resolve(value):
+        return strings.resolve(value, str_offsets_base, reader.offset_size)
+
+    files = []
+    if reader.version >= 5:
+
+        def entries():
+            formats = [(reader.uleb(), reader.uleb()) for _ in range(reader.uint(1))]
+            result = []
+            for _ in range(reader.uleb()):
+                entry = {}
+                for content, form in formats:
+                    entry[content] = reader.form(form)
+                result.append(entry)
+            return result
+
+        dirs = [resolve(entry.get(DW_LNCT_path, "")) for entry in entries()]
+        if dirs:
+            dirs[0] = os.path.join(comp_dir, dirs[0])
+        for entry in entries():
+            index = entry.get(DW_LNCT_directory_index, 0)
+            files.append((dirs[index] if index < len(dirs) else comp_dir, resolve(entry.get(DW_LNCT_path, ""))))
+    else:
+        dirs = [comp_dir]
+        while True:
+            path = reader.cstr()
+            if not path:
+                break
+            dirs.append(path)
+        while True:
+            path = reader.cstr()
+            if not path:
+                break
+            index = reader.uleb()
+            reader.uleb()  # mtime
+            reader.uleb()  # length
+            files.append((dirs[index] if index < len(dirs) else comp_dir, path))
+    return [os.path.join(comp_dir, directory, path) for directory, path in files]
+
+
+def source_files(path):
+    """Return the normalized paths of all source files referenced by the DWARF data of an ELF file"""
+    sections = elf.section_data(path, DEBUG_SECTIONS)
+    if not sections or ".debug_info" not in sections or ".debug_abbrev" not in sections:
+        return set()
+    with open(path, "rb") as f:
+        endian = "<" if f.read(6)[5] == 1 else ">"
+    sources = set()
+    try:
+        for name, comp_dir, stmt_list, str_offsets_base in _compile_units(sections, endian):
+            if name:
+                sources.add(os.path.normpath(os.path.join(comp_dir, name)))
+            if stmt_list is not None:
+                for file in _line_files(sections, endian, stmt_list, comp_dir, str_offsets_base):
+                    sources.add(os.path.normpath(file))
+    except (IndexError, KeyError, struct.error) as e:
+        raise ValueError(f"Cannot parse DWARF data of {path}: {e}")
+    return sources
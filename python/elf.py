@@ -0,0 +1,118 @@
+import mmap
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+ELF_MAGIC = b"\x7fELF"
+
+SHN_XINDEX = 0xFFFF
+SHT_NOBITS = 8
+SHF_COMPRESSED = 0x800
+ELFCOMPRESS_ZLIB = 1
+
+Section = namedtuple("Section", ["name", "type", "flags", "offset", "size"])
+ElfInfo = namedtuple("ElfInfo", ["is_elf", "has_debug_info", "has_symtab"])
+
+NOT_ELF = ElfInfo(False, False, False)
+
+
+def _formats(ei_class, ei_data):
+    endian = "<" if ei_data == 1 else ">"
+    if ei_class == 2:
+        # ELF header: e_shoff, e_shentsize, e_shnum, e_shstrndx
+        # Section header: sh_name, sh_type, sh_flags, sh_offset, sh_size, sh_link
+        return struct.Struct(endian + "40xQ10xHHH"), struct.Struct(endian + "IIQ8xQQI")
+    return struct.Struct(endian + "32xI10xHHH"), struct.Struct(endian + "III4xIII")
+
+
+def _parse_sections(data):
+    if len(data) < 16 or data[:4] != ELF_MAGIC:
+        return None
+    ei_class, ei_data = data[4], data[5]
+    if ei_class not in (1, 2) or ei_data not in (1, 2):
+        return None
+    ehdr, shdr = _formats(ei_class, ei_data)
+    if len(data) < ehdr.size:
+        return None
+    shoff, shentsize, shnum, shstrndx = ehdr.unpack_from(data)
+    if shoff == 0 or shentsize < shdr.size or shoff + shdr.size > len(data):
+        return {}
+
+    # Large section counts and string table indices are stored in the first section header
+    if shnum == 0 or shstrndx == SHN_XINDEX:
+        _, _, _, _, first_size, first_link = shdr.unpack_from(data, shoff)
+        if shnum == 0:
+            shnum = first_size
+        if shstrndx == SHN_XINDEX:
+            shstrndx = first_link
+    if shoff + shnum * shentsize > len(data) or shstrndx >= shnum:
+        return {}
+
+    headers = [shdr.unpack_from(data, shoff + i * shentsize) for i in range(shnum)]
+    strtab_offset = headers[shstrndx][3]
+
+    sections = {}
+    for sh_name, sh_type, sh_flags, sh_offset, sh_size, _ in headers:
+        start = strtab_offset + sh_name
+        end = data.find(b"\0", start)
+        if end < 0:
+            continue
+        name = bytes(data[start:end]).decode("utf-8", "replace")
+        sections[name] = Section(name, sh_type, sh_flags, sh_offset, sh_size)
+    return sections
+
+
+def _with_map(path, parse):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 16 or f.read(4) != ELF_MAGIC:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return parse(data)
+
+
+def _parse_section_data(data, names):
+    secs = _parse_sections(data)
+    if secs is None:
+        return None
+    endian = "<" if data[5] == 1 else ">"
+    chdr = struct.Struct(endian + ("I4xQ8x" if data[4] == 2 else "II4x"))
+    contents = {}
+    for name in names:
+        sec = secs.get(name)
+        if not sec or sec.type == SHT_NOBITS or sec.offset + sec.size > len(data):
+            continue
+        content = bytes(data[sec.offset : sec.offset + sec.size])
+        if sec.flags & SHF_COMPRESSED:
+            ch_type, ch_size = chdr.unpack_from(content)
+            if ch_type != ELFCOMPRESS_ZLIB:
+                raise ValueError(f"Unsupported compression type {ch_type} in section {name}")
+            content = zlib.decompress(content[chdr.size :])
+            if len(content) != ch_size:
+                raise ValueError(f"Corrupt compressed section {name}")
+        contents[name] = content
+    return contents
+
+
+def sections(path):
+    """Return the section table of an ELF file by name, or None if it is not ELF"""
+    try:
+        return _with_map(path, _parse_sections)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def section_data(path, names):
+    """Return the (decompressed) contents of the named sections that exist in an ELF file"""
+    try:
+        return _with_map(path, lambda data: _parse_section_data(data, names))
+    except (OSError, struct.error, zlib.error) as e:
+        raise ValueError(f"Cannot read sections of {path}: {e}")
+
+
+def classify(path):
+    """Classify a file like `file` does: is it ELF, has debug_info, is it not stripped"""
+    secs = sections(path)
+    if secs is None:
+        return NOT_ELF
+    return ElfInfo(True, ".debug_info" in secs, ".symtab" in secs)
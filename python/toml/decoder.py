@@ -180,14 +180,19 @@ def loads(s, _dict=dict, decoder=None):
     implicitgroups = []
     if decoder is None:
         decoder = TomlDecoder(_dict)
-    retval = decoder.get_empty_table()
-    currentlevel = retval
     if not isinstance(s, basestring):
         raise TypeError("Expecting something like a string")
 
     if not isinstance(s, unicode):
         s = s.decode('utf8')
 
+    if type(decoder) is TomlDecoder:
+        retval = _fast_loads(s, decoder)
+        if retval is not None:
+            return retval
+    retval = decoder.get_empty_table()
+    currentlevel = retval
+
     original = s
     sl = list(s)
     openarr = 0
@@ -456,47 +461,8 @@ def loads(s, _dict=dict, decoder=None):
                                               groups[i] + "'. Try quoting it.",
                                               original, pos)
                 i += 1
-            currentlevel = retval
-            for i in _range(len(groups)):
-                group = groups[i]
-                if group == "":
-                    raise TomlDecodeError("Can't have a keygroup with an empty "
-                                          "name", original, pos)
-                try:
-                    currentlevel[group]
-                    if i == len(groups) - 1:
-                        if group in implicitgroups:
-                            implicitgroups.remove(group)
-                            if arrayoftables:
-                                raise TomlDecodeError("An implicitly defined "
-                                                      "table can't be an array",
-                                                      original, pos)
-                        elif arrayoftables:
-                            currentlevel[group].append(decoder.get_empty_table()
-                                                       )
-                        else:
-                            raise TomlDecodeError("What? " + group +
-                                                  " already exists?" +
-                                                  str(currentlevel),
-                                                  original, pos)
-                except TypeError:
-                    currentlevel = currentlevel[-1]
-                    if group not in currentlevel:
-                        currentlevel[group] = decoder.get_empty_table()
-                        if i == len(groups) - 1 and arrayoftables:
-                            currentlevel[group] = [decoder.get_empty_table()]
-                except KeyError:
-                    if i != len(groups) - 1:
-                        implicitgroups.append(group)
-                    currentlevel[group] = decoder.get_empty_table()
-                    if i == len(groups) - 1 and arrayoftables:
-                        currentlevel[group] = [decoder.get_empty_table()]
-                currentlevel = currentlevel[group]
-                if arrayoftables:
-                    try:
-                        currentlevel = currentlevel[-1]
-                    except KeyError:
-                        pass
+            currentlevel = _load_group(decoder, retval, implicitgroups,
+                                       groups, arrayoftables, original, pos)
         elif line[0] == "{":
             if line[-1] != "}":
                 raise TomlDecodeError("Line breaks are not allowed in inline"
@@ -517,6 +483,245 @@ def loads(s, _dict=dict, decoder=None):
     return retval
 
 
+def _load_group(decoder, retval, implicitgroups, groups, arrayoftables,
+                original, pos):
+    """Creates the tables of a [group] or [[group]] header and returns the
+    table that following keys are added to."""
+    currentlevel = retval
+    for i in _range(len(groups)):
+        group = groups[i]
+        if group == "":
+            raise TomlDecodeError("Can't have a keygroup with an empty "
+                                  "name", original, pos)
+        try:
+            currentlevel[group]
+            if i == len(groups) - 1:
+                if group in implicitgroups:
+                    implicitgroups.remove(group)
+                    if arrayoftables:
+                        raise TomlDecodeError("An implicitly defined "
+                                              "table can't be an array",
+                                              original, pos)
+                elif arrayoftables:
+                    currentlevel[group].append(decoder.get_empty_table())
+                else:
+                    raise TomlDecodeError("What? " + group +
+                                          " already exists?" +
+                                          str(currentlevel),
+                                          original, pos)
+        except TypeError:
+            currentlevel = currentlevel[-1]
+            if group not in currentlevel:
+                currentlevel[group] = decoder.get_empty_table()
+                if i == len(groups) - 1 and arrayoftables:
+                    currentlevel[group] = [decoder.get_empty_table()]
+        except KeyError:
+            if i != len(groups) - 1:
+                implicitgroups.append(group)
+            currentlevel[group] = decoder.get_empty_table()
+            if i == len(groups) - 1 and arrayoftables:
+                currentlevel[group] = [decoder.get_empty_table()]
+        currentlevel = currentlevel[group]
+        if arrayoftables:
+            try:
+                currentlevel = currentlevel[-1]
+            except KeyError:
+                pass
+    return currentlevel
+
+
+class _Unsupported(Exception):
+    """Input the fast decoder leaves to the character based one."""
+
+
+# Tokens of the fast decoder. It covers the subset of TOML that manifests and
+# lock files are written in, everything else is handed back to loads.
+_fast_blank_re = re.compile(r'(?:[ \t]*(?:#[^\r\n]*)?\r?\n)*')
+_fast_eof_re = re.compile(r'[ \t]*(?:#[^\r\n]*)?\Z')
+_fast_line_end_re = re.compile(r'[ \t]*(?:#[^\r\n]*)?(?:\r?\n|\Z)')
+_fast_ws_re = re.compile(r'[ \t]*')
+_fast_array_ws_re = re.compile(r'(?:[ \t]+|\r?\n|#[^\r\n]*)*')
+_fast_group_part = r'(?:[A-Za-z0-9_-]+|"[^"\\\r\n.\[\]]+"|' \
+                   r"'[^'\r\n.\[\]]+')"
+_fast_group_part_re = re.compile(_fast_group_part)
+_fast_group_re = re.compile(r'(\[\[?)[ \t]*({0}(?:[ \t]*\.[ \t]*{0})*)[ \t]*'
+                            r'(\]\]?)'.format(_fast_group_part))
+# Most lines of manifests and lock files, a plain string assigned to a key
+_fast_string_line_re = re.compile(r'[ \t]*([A-Za-z0-9_-]+)[ \t]*=[ \t]*'
+                                  r'"([^"\\\r\n]*)"'
+                                  r'[ \t]*(?:#[^\r\n]*)?(?:\r?\n|\Z)')
+# Arrays of plain strings like the dependencies of lock files, without
+# comments so that every quoted token is an item
+_fast_string_item = r'"[^"\\\r\n\[\]{},]*"'
+_fast_string_array_re = re.compile(r'(?:[ \t\r\n]*' + _fast_string_item +
+                                   r'[ \t\r\n]*,)*(?:[ \t\r\n]*' +
+                                   _fast_string_item + r')?[ \t\r\n]*\]')
+_fast_string_item_re = re.compile(r'"([^"\\\r\n\[\]{},]*)"')
+_fast_key_re = re.compile(r'[A-Za-z0-9_-]+(?:\.[A-Za-z0-9_-]+)*')
+_fast_inline_key_re = re.compile(r'[A-Za-z0-9_-]+')
+_fast_equals_re = re.compile(r'[ \t]*=[ \t]*')
+_fast_basic_str_re = re.compile(r'"(?:[^"\\\r\n]|\\.)*"')
+_fast_literal_str_re = re.compile(r"'[^'\r\n]*'")
+_fast_scalar_re = re.compile(r'(?:true|false|-?(?:0|[1-9](?:_?[0-9])*)'
+                             r'(?:\.[0-9](?:_?[0-9])*)?'
+                             r'(?:[eE][+-]?[0-9](?:_?[0-9])*)?)'
+                             r'(?=[ \t\r\n,\]}#]|\Z)')
+# Characters the character based decoder splits nested values on
+_fast_nested_unsafe = frozenset('\\[]{},')
+
+# Where a value is found, inline tables only take single line arrays of
+# scalars as the character based decoder splits them on commas
+_FAST_TOP, _FAST_ARRAY, _FAST_INLINE, _FAST_INLINE_ARRAY = range(4)
+
+
+def _fast_value(s, pos, decoder, context):
+    char = s[pos:pos + 1]
+    if char == '"' or char == "'":
+        if s.startswith(char * 3, pos):
+            raise _Unsupported()
+        if char == '"':
+            match = _fast_basic_str_re.match(s, pos)
+        else:
+            match = _fast_literal_str_re.match(s, pos)
+        if match is None:
+            raise _Unsupported()
+        token = match.group()
+        if context != _FAST_TOP and \
+                not _fast_nested_unsafe.isdisjoint(token):
+            raise _Unsupported()
+        if char == '"' and '\\' in token:
+            return decoder.load_value(token)[0], "str", match.end()
+        return token[1:-1], "str", match.end()
+    if char == '[' and context != _FAST_INLINE_ARRAY:
+        return _fast_array(s, pos + 1, decoder, context == _FAST_INLINE)
+    if char == '{' and context == _FAST_TOP:
+        return _fast_inline_table(s, pos + 1, decoder)
+    match = _fast_scalar_re.match(s, pos)
+    if match is None:
+        raise _Unsupported()
+    value, vtype = decoder.load_value(match.group())
+    return value, vtype, match.end()
+
+
+def _fast_array(s, pos, decoder, inline):
+    if not inline:
+        match = _fast_string_array_re.match(s, pos)
+        if match is not None:
+            return (_fast_string_item_re.findall(s, pos, match.end()), "array",
+                    match.end())
+    retval = []
+    atype = None
+    ws_re = _fast_ws_re if inline else _fast_array_ws_re
+    context = _FAST_INLINE_ARRAY if inline else _FAST_ARRAY
+    pos = ws_re.match(s, pos).end()
+    if s.startswith(']', pos):
+        return retval, "array", pos + 1
+    while True:
+        value, vtype, pos = _fast_value(s, pos, decoder, context)
+        if atype is not None and vtype != atype:
+            raise _Unsupported()
+        atype = vtype
+        retval.append(value)
+        pos = ws_re.match(s, pos).end()
+        if s.startswith(']', pos):
+            return retval, "array", pos + 1
+        if not s.startswith(',', pos):
+            raise _Unsupported()
+        pos = ws_re.match(s, pos + 1).end()
+        if s.startswith(']', pos) and not inline:
+            return retval, "array", pos + 1
+
+
+def _fast_inline_table(s, pos, decoder):
+    retval = decoder.get_empty_inline_table()
+    pos = _fast_ws_re.match(s, pos).end()
+    if s.startswith('}', pos):
+        return retval, "inline_object", pos + 1
+    while True:
+        match = _fast_inline_key_re.match(s, pos)
+        if match is None:
+            raise _Unsupported()
+        key = match.group()
+        match = _fast_equals_re.match(s, match.end())
+        if match is None:
+            raise _Unsupported()
+        value, _, pos = _fast_value(s, match.end(), decoder, _FAST_INLINE)
+        if key in retval:
+            raise _Unsupported()
+        retval[key] = value
+        pos = _fast_ws_re.match(s, pos).end()
+        if s.startswith('}', pos):
+            return retval, "inline_object", pos + 1
+        if not s.startswith(',', pos):
+            raise _Unsupported()
+        pos = _fast_ws_re.match(s, pos + 1).end()
+
+
+def _fast_loads(s, decoder):
+    """Parses a document line by line with compiled regular expressions.
+
+    Returns None for input outside the supported subset, including all
+    invalid input, so that the character based decoder produces the result
+    or the error."""
+    retval = decoder.get_empty_table()
+    currentlevel = retval
+    implicitgroups = []
+    pos = 0
+    try:
+        while True:
+            pos = _fast_blank_re.match(s, pos).end()
+            match = _fast_string_line_re.match(s, pos)
+            if match is not None:
+                key = match.group(1)
+                if key in currentlevel:
+                    raise _Unsupported()
+                currentlevel[key] = match.group(2)
+                pos = match.end()
+                continue
+            if _fast_eof_re.match(s, pos):
+                return retval
+            pos = _fast_ws_re.match(s, pos).end()
+            if s.startswith('[', pos):
+                match = _fast_group_re.match(s, pos)
+                if match is None or \
+                        len(match.group(1)) != len(match.group(3)):
+                    raise _Unsupported()
+                groups = [group[1:-1] if group[0] in '"\'' else group
+                          for group in
+                          _fast_group_part_re.findall(match.group(2))]
+                currentlevel = _load_group(decoder, retval, implicitgroups,
+                                           groups, len(match.group(1)) == 2,
+                                           s, pos)
+                pos = match.end()
+            else:
+                match = _fast_key_re.match(s, pos)
+                if match is None:
+                    raise _Unsupported()
+                keys = match.group().split('.')
+                match = _fast_equals_re.match(s, match.end())
+                if match is None:
+                    raise _Unsupported()
+                value, _, pos = _fast_value(s, match.end(), decoder,
+                                            _FAST_TOP)
+                level = currentlevel
+                for key in keys[:-1]:
+                    if key not in level:
+                        level[key] = decoder.get_empty_table()
+                    level = level[key]
+                    if not isinstance(level, dict):
+                        raise _Unsupported()
+                if keys[-1] in level:
+                    raise _Unsupported()
+                level[keys[-1]] = value
+            match = _fast_line_end_re.match(s, pos)
+            if match is None:
+                raise _Unsupported()
+            pos = match.end()
+    except Exception:
+        # Includes the errors of invalid input, loads reports them
+        return None
+
+
 def _load_date(val):
     microsecond = 0
     tz = None
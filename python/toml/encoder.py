@@ -26,9 +26,11 @@ def dump(o, f, encoder=None):
 
     if not f.write:
         raise TypeError("You can only dump an object to a file descriptor")
-    d = dumps(o, encoder=encoder)
-    f.write(d)
-    return d
+    retval = []
+    for fragment in _dump_fragments(o, encoder):
+        f.write(fragment)
+        retval.append(fragment)
+    return "".join(retval)
 
 
 def dumps(o, encoder=None):
@@ -54,11 +56,19 @@ def dumps(o, encoder=None):
         ```
     """
 
-    retval = ""
+    return "".join(_dump_fragments(o, encoder))
+
+
+def _dump_fragments(o, encoder=None):
+    """Yields the toml of o in output order, one section at a time"""
+
     if encoder is None:
         encoder = TomlEncoder(o.__class__)
     addtoretval, sections = encoder.dump_sections(o, "")
-    retval += addtoretval
+    # Last two characters written, to separate sections by an empty line
+    tail = addtoretval[-2:]
+    if addtoretval:
+        yield addtoretval
     outer_objs = [id(o)]
     while sections:
         section_ids = [id(section) for section in sections.values()]
@@ -72,15 +82,14 @@ def dumps(o, encoder=None):
                 sections[section], section)
 
             if addtoretval or (not addtoretval and not addtosections):
-                if retval and retval[-2:] != "\n\n":
-                    retval += "\n"
-                retval += "[" + section + "]\n"
-                if addtoretval:
-                    retval += addtoretval
+                fragment = "[" + section + "]\n" + addtoretval
+                if tail and tail != "\n\n":
+                    fragment = "\n" + fragment
+                tail = (tail + fragment)[-2:]
+                yield fragment
             for s in addtosections:
                 newsections[section + "." + s] = addtosections[s]
         sections = newsections
-    return retval
 
 
 def _dump_str(v):
@@ -148,11 +157,11 @@ class TomlEncoder(object):
         return self._dict()
 
     def dump_list(self, v):
-        retval = "["
+        retval = ["["]
         for u in v:
-            retval += " " + unicode(self.dump_value(u)) + ","
-        retval += "]"
-        return retval
+            retval.append(" " + unicode(self.dump_value(u)) + ",")
+        retval.append("]")
+        return "".join(retval)
 
     def dump_inline_table(self, section):
         """Preserve inline table in its compact syntax instead of expanding
@@ -180,11 +189,11 @@ class TomlEncoder(object):
         return dump_fn(v) if dump_fn is not None else self.dump_funcs[str](v)
 
     def dump_sections(self, o, sup):
-        retstr = ""
+        retstr = []
         if sup != "" and sup[-1] != ".":
             sup += '.'
         retdict = self._dict()
-        arraystr = ""
+        arraystr = []
         for section in o:
             section = unicode(section)
             qsection = section
@@ -198,14 +207,14 @@ class TomlEncoder(object):
                             arrayoftables = True
                 if arrayoftables:
                     for a in o[section]:
-                        arraytabstr = "\n"
-                        arraystr += "[[" + sup + qsection + "]]\n"
+                        arraytabstr = ["\n"]
+                        arraystr.append("[[" + sup + qsection + "]]\n")
                         s, d = self.dump_sections(a, sup + qsection)
                         if s:
                             if s[0] == "[":
-                                arraytabstr += s
+                                arraytabstr.append(s)
                             else:
-                                arraystr += s
+                                arraystr.append(s)
                         while d:
                             newd = self._dict()
                             for dsec in d:
@@ -213,24 +222,25 @@ class TomlEncoder(object):
                                                             qsection + "." +
                                                             dsec)
                                 if s1:
-                                    arraytabstr += ("[" + sup + qsection +
-                                                    "." + dsec + "]\n")
-                                    arraytabstr += s1
+                                    arraytabstr.append("[" + sup + qsection +
+                                                       "." + dsec + "]\n")
+                                    arraytabstr.append(s1)
                                 for s1 in d1:
                                     newd[dsec + "." + s1] = d1[s1]
                             d = newd
                         arraystr += arraytabstr
                 else:
                     if o[section] is not None:
-                        retstr += (qsection + " = " +
-                                   unicode(self.dump_value(o[section])) + '\n')
+                        retstr.append(qsection + " = " +
+                                      unicode(self.dump_value(o[section])) +
+                                      '\n')
             elif self.preserve and isinstance(o[section], InlineTableDict):
-                retstr += (qsection + " = " +
-                           self.dump_inline_table(o[section]))
+                retstr.append(qsection + " = " +
+                              self.dump_inline_table(o[section]))
             else:
                 retdict[qsection] = o[section]
         retstr += arraystr
-        return (retstr, retdict)
+        return ("".join(retstr), retdict)
 
 
 class TomlPreserveInlineDictEncoder(TomlEncoder):
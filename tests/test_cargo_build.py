@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"))
+
+try:
+    import build
+except ImportError:
+    build = None
+
+CRATE_TOML = """\
+[package]
+name = "{0}"
+version = "0.1.0"
+edition = "2021"
+
+[lib]
+crate-type = ["cdylib", "rlib"]
+
+[dependencies]
+{1}
+"""
+
+
+@unittest.skipIf(build is None, "build needs conan")
+@unittest.skipIf(shutil.which("cargo") is None, "cargo is not installed")
+class CargoBuildTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        with open(os.path.join(self.folder, "Cargo.toml"), "w") as f:
+            f.write('[workspace]\nmembers = ["a", "b"]\nresolver = "2"\n')
+        self.crate("a", 'b = { path = "../b" }')
+        self.crate("b", "")
+        self.recipe = build.RustRecipe.__new__(build.RustRecipe)
+        self.recipe.build_folder = os.path.join(self.folder, "build")
+        os.makedirs(self.recipe.build_folder)
+
+    def crate(self, name, dependencies):
+        os.makedirs(os.path.join(self.folder, name, "src"))
+        with open(os.path.join(self.folder, name, "Cargo.toml"), "w") as f:
+            f.write(CRATE_TOML.format(name, dependencies))
+        with open(os.path.join(self.folder, name, "src", "lib.rs"), "w") as f:
+            f.write("pub fn f() {}\n")
+
+    def test_path_dependencies_are_not_recorded(self):
+        self.recipe.cargo_build(["--offline"], cwd=os.path.join(self.folder, "a"))
+        with open(os.path.join(self.recipe.build_folder, build.CARGO_ARTIFACTS_FILE)) as f:
+            records = json.load(f)
+        self.assertEqual(records, [[os.path.join(build.CARGO_ARTIFACTS_FOLDER, "cdylib", "liba.so"), "cdylib"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"))
+
+import dwarf
+import elf
+
+# Header fields after header_length, line_range is deliberately not opcode_base + 1
+MIN_INST_LENGTH = 1
+MAX_OPS_PER_INST = 1
+DEFAULT_IS_STMT = 1
+LINE_BASE = -3
+LINE_RANGE = 10
+OPCODE_BASE = 13
+STANDARD_OPCODE_LENGTHS = bytes([0, 1, 1, 1, 1, 0, 0, 0, 1, 0, 0, 1])
+
+DW_FORM_string = 0x08
+DW_FORM_udata = 0x0F
+DW_LNCT_path = 0x1
+DW_LNCT_directory_index = 0x2
+
+
+def cstr(s):
+    return s.encode("utf-8") + b"\0"
+
+
+def line_program(version, tables):
+    """Build a .debug_line unit with an empty line program"""
+    fields = [MIN_INST_LENGTH]
+    if version >= 4:
+        fields.append(MAX_OPS_PER_INST)
+    fields += [DEFAULT_IS_STMT, LINE_BASE & 0xFF, LINE_RANGE, OPCODE_BASE]
+    header = bytes(fields) + STANDARD_OPCODE_LENGTHS + tables
+    unit = struct.pack("<H", version)
+    if version >= 5:
+        unit += bytes([8, 0])  # address_size, segment_selector_size
+    unit += struct.pack("<I", len(header)) + header
+    return struct.pack("<I", len(unit)) + unit
+
+
+def v4_tables(dirs, files):
+    tables = b"".join(cstr(d) for d in dirs) + b"\0"
+    for name, index in files:
+        tables += cstr(name) + bytes([index, 0, 0])
+    return tables + b"\0"
+
+
+def v5_tables(dirs, files):
+    tables = bytes([1, DW_LNCT_path, DW_FORM_string, len(dirs)]) + b"".join(cstr(d) for d in dirs)
+    tables += bytes([2, DW_LNCT_path, DW_FORM_string, DW_LNCT_directory_index, DW_FORM_udata, len(files)])
+    for name, index in files:
+        tables += cstr(name) + bytes([index])
+    return tables
+
+
+class LineFilesTest(unittest.TestCase):
+    def line_files(self, data):
+        return dwarf._line_files({".debug_line": data}, "<", 0, "/comp", 8)
+
+    def test_v3(self):
+        data = line_program(3, v4_tables(["inc"], [("a.c", 0), ("b.h", 1)]))
+        self.assertEqual(self.line_files(data), ["/comp/a.c", "/comp/inc/b.h"])
+
+    def test_v4(self):
+        data = line_program(4, v4_tables(["inc"], [("a.c", 0), ("b.h", 1)]))
+        self.assertEqual(self.line_files(data), ["/comp/a.c", "/comp/inc/b.h"])
+
+    def test_v5(self):
+        data = line_program(5, v5_tables(["src", "inc"], [("a.c", 0), ("b.h", 1)]))
+        self.assertEqual(self.line_files(data), ["/comp/src/a.c", "/comp/inc/b.h"])
+
+
+class StringsTest(unittest.TestCase):
+    def test_supplementary_forms_are_rejected(self):
+        strings = dwarf.Strings({}, "<")
+        for value in [(0x1F21, 0), (0x1D, 0), 5, b"x"]:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    strings.resolve(value)
+
+
+@unittest.skipIf(shutil.which("gcc") is None, "gcc is not installed")
+class CompiledTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        os.makedirs(os.path.join(self.folder, "src"))
+        with open(os.path.join(self.folder, "src", "foo.h"), "w") as f:
+            f.write("static inline int foo(void) { return 42; }\n")
+        with open(os.path.join(self.folder, "src", "foo.c"), "w") as f:
+            f.write('#include "foo.h"\nint bar(void) { return foo(); }\n')
+
+    def compile(self, *flags):
+        output = os.path.join(self.folder, "libfoo.so")
+        subprocess.check_call(
+            ["gcc", "-shared", "-fPIC", *flags, "src/foo.c", "-o", output], cwd=self.folder
+        )
+        return output
+
+    def test_source_files(self):
+        for version in ("-gdwarf-4", "-gdwarf-5"):
+            with self.subTest(version=version):
+                sources = dwarf.source_files(self.compile(version))
+                self.assertIn(os.path.join(self.folder, "src", "foo.c"), sources)
+                self.assertIn(os.path.join(self.folder, "src", "foo.h"), sources)
+
+    def test_classify(self):
+        self.assertEqual(elf.classify(self.compile("-g")), elf.ElfInfo(True, True, True))
+        self.assertEqual(elf.classify(self.compile("-s")), elf.ElfInfo(True, False, False))
+        self.assertEqual(elf.classify(os.path.join(self.folder, "src", "foo.c")), elf.NOT_ELF)
+        self.assertIsNone(elf.section_data(os.path.join(self.folder, "src", "foo.c"), [".debug_info"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"))
+
+import toml
+from toml import decoder
+
+CARGO_TOML = """\
+[package]
+name = "foo-bar"
+version = "0.1.0"
+edition = "2021"
+authors = ["A <a@example.com>", "B"]
+description = "x, y = z"
+
+[lib]
+crate-type = ["cdylib", "rlib"]
+
+[[bin]]
+name = "foo"
+path = "src/bin/foo.rs"
+
+[dependencies]
+serde = { version = "1.0", features = ["derive"] }
+tokio = { version = "1", features = ["full"], optional = true }
+local = { path = "../local" }
+git-dep = { git = "https://example.com/x", branch = "main" }
+regex = "1"
+
+[target.'cfg(target_os = "linux")'.dependencies]
+libc = "0.2"
+
+[target."cfg(windows)".build-dependencies]
+cc = "1.0"
+
+[features]
+default = ["std"]
+std = []
+
+[profile.release]
+lto = true
+opt-level = 3
+codegen-units = 1
+"""
+
+CARGO_WORKSPACE_TOML = """\
+[workspace]
+members = [
+    "crates/a",
+    "crates/b", # second
+]
+
+[workspace.package]
+version = "1.2.3"
+
+[workspace.dependencies]
+anyhow = "1"
+
+[patch.crates-io]
+serde = { path = "vendor/serde" }
+"""
+
+CARGO_MEMBER_TOML = """\
+[package]
+name = "a"
+version.workspace = true
+description = "caf\\u00e9\\tbar"
+
+[dependencies]
+anyhow = { workspace = true }
+"""
+
+CARGO_LOCK = """\
+# This file is automatically @generated by Cargo.
+# It is not intended for manual editing.
+version = 3
+
+[[package]]
+name = "anyhow"
+version = "1.0.75"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+checksum = "a4668cab20f66d8d020e1fbc0ebe47217433c1b6c8f2040faf858554e394ace6"
+
+[[package]]
+name = "foo-bar"
+version = "0.1.0"
+dependencies = [
+ "anyhow",
+ "serde 1.0.188",
+]
+
+[[package]]
+name = "serde"
+version = "1.0.188"
+source = "registry+https://github.com/rust-lang/crates.io-index"
+"""
+
+FIXTURES = [CARGO_TOML, CARGO_WORKSPACE_TOML, CARGO_MEMBER_TOML, CARGO_LOCK]
+
+EDGE_CASES = [
+    "",
+    "# comment\n\n  \n",
+    "a = 1\r\n[b]\r\nc = [\r\n 1,\r\n]\r\n",
+    'a = [\n  "a", # c\n  "b",\n]\n',
+    'a = [ "a",\n # "b", "q"\n "c",\n]\n',
+    'a = ["x#y", "z"] # "w"\n',
+    # Left to the character based decoder, which splits nested values on commas
+    'tokio = { version = ">=1.0, <2", features = ["full"] }\n',
+    'a = "b" # c\n[x] # y\n[[z]] # w\n',
+    "a = [[1, 2], [3]]\n",
+    "a = [{ x = 1 }, { x = 2 }]\n",
+    "a = { b = { c = 1 } }\n",
+    "a = { x = 1, }\n",
+    "a = [1, 2,]\n",
+    "a = []\nb = {}\n",
+    "a.b = 1\na.c = 2\n",
+    "[a]\nb.c = 1\n",
+    "[ a . b ]\nc = 1\n",
+    "[a . 'b c']\n",
+    "[a]\nx = 1\n[a.b]\ny = 2\n[[a.c]]\nz = 3\n[[a.c]]\nz = 4\n",
+    "[[a]]\n[a.b]\nx = 1\n[[a]]\n[a.b]\nx = 2\n",
+    "[a.b]\n[a]\n",
+    'a = "\\u00e9\\n\\t\\\\"\n',
+    'x = "a\\"b"\n',
+    "a = 'C:\\x'\n",
+    'a = """x"""\n',
+    "a = 1.5e3\nb = -0.5\nc = 1_000\nd = -0\n",
+    "a = true\nb = false\n",
+    "a = 1979-05-27\n",
+    # Invalid documents must fail the same way in both paths
+    "a = 1\na = 2\n",
+    "[a]\n[a]\n",
+    'a = [1, "x"]\n',
+    "a = 01\n",
+    'a = "x" b\n',
+    "= 1\n",
+    'x = "\\x"\n',
+]
+
+
+class LegacyDecoder(toml.TomlDecoder):
+    """loads only takes the fast path for exact TomlDecoder instances"""
+
+
+def normalize(value):
+    if isinstance(value, dict):
+        return (type(value).__name__, [(key, normalize(item)) for key, item in value.items()])
+    if isinstance(value, list):
+        return ("list", [normalize(item) for item in value])
+    return (type(value).__name__, value)
+
+
+def parse(s, decoder=None):
+    try:
+        return ("ok", normalize(toml.loads(s, decoder=decoder)))
+    except toml.TomlDecodeError as e:
+        return ("error", str(e))
+
+
+class FastDecoderTest(unittest.TestCase):
+    def test_fixtures_use_fast_path(self):
+        for index, fixture in enumerate(FIXTURES):
+            with self.subTest(fixture=index):
+                self.assertIsNotNone(decoder._fast_loads(fixture, toml.TomlDecoder()))
+
+    def test_fixtures_match_legacy(self):
+        for index, fixture in enumerate(FIXTURES):
+            with self.subTest(fixture=index):
+                self.assertEqual(parse(fixture), parse(fixture, LegacyDecoder()))
+
+    def test_edge_cases_match_legacy(self):
+        for case in EDGE_CASES:
+            with self.subTest(case=case):
+                self.assertEqual(parse(case), parse(case, LegacyDecoder()))
+
+
+if __name__ == "__main__":
+    unittest.main()